@@ -1,42 +1,239 @@
-from flask import Flask, render_template, request, redirect, url_for, session, flash
+import time
+
+# 启动计时从导入本模块开始
+STARTUP_STARTED = time.perf_counter()
+
+from flask import (Flask, Response, render_template, stream_template, request, redirect, url_for, session,
+                   flash, get_flashed_messages, jsonify, g, before_render_template, template_rendered)
+from jinja2 import FileSystemBytecodeCache
+from markupsafe import Markup
 from datetime import datetime, timedelta
 from typing import Optional
+import heapq
+import itertools
+import logging
 import os
+import sys
 import json
+import threading
+
+from broadcaster import Broadcaster, format_sse
+from compression import init_compression
+from fines import FineEngine
+from fragment_cache import FragmentCache
+from fuzzy_index import TrigramIndex
+from library_stats import LibraryStats
+from loan_history import LoanHistory
+from memory_usage import MemoryAccounting, SnapshotStore, deep_sizeof, estimate
+from metrics import CallbackMetric, Histogram, Registry
+from pinyin_index import PinyinIndex
+from profiling import StackSampler, init_request_profiling
+from recommendations import CoBorrowIndex
+from reminders import Outbox, ReminderScheduler, make_sink
+from reservations import Reservation, ReservationQueue
+from series_index import SeriesIndex
+from shared_state import SharedStore
+from startup import StartupTimer, track_first_request
+from static_assets import init_static_fingerprints
+from tracing import Tracer, init_request_tracing
+from trending import TrendingCounter
 
 app = Flask(__name__)
 app.secret_key = 'your-secret-key-here'
 
+# 启动各阶段耗时，启动完成后写入日志并通过 /metrics 导出
+startup_timer = StartupTimer(STARTUP_STARTED)
+track_first_request(app, startup_timer)
+
+# 模板字节码缓存，重启后不必重新解析模板
+TEMPLATE_CACHE_DIR = os.path.join(app.root_path, '.jinja_cache')
+os.makedirs(TEMPLATE_CACHE_DIR, exist_ok=True)
+app.jinja_env.bytecode_cache = FileSystemBytecodeCache(TEMPLATE_CACHE_DIR)
+
+# 响应压缩：小于该字节数的响应不压缩
+COMPRESS_MIN_SIZE = 500
+init_compression(app, COMPRESS_MIN_SIZE)
+
+# 静态资源地址带内容哈希，浏览器可以长期缓存
+init_static_fingerprints(app)
+
+# 运行指标，通过 /metrics 以 Prometheus 文本格式导出
+metrics_registry = Registry()
+REQUEST_SECONDS = metrics_registry.register(Histogram(
+    'library_request_duration_seconds', '请求处理耗时', ('route', 'method', 'status')))
+PERSISTENCE_SECONDS = metrics_registry.register(Histogram(
+    'library_persistence_duration_seconds', '数据文件读写耗时', ('operation',)))
+TEMPLATE_SECONDS = metrics_registry.register(Histogram(
+    'library_template_render_duration_seconds', '模板渲染耗时', ('template',)))
+
+_template_starts = threading.local()
+
+def _template_started(sender, template, context, **extra):
+    _template_starts.__dict__.setdefault('stack', []).append((template.name, time.perf_counter()))
+
+def _template_finished(sender, template, context, **extra):
+    stack = getattr(_template_starts, 'stack', None)
+    # 渲染出错的模板不会触发完成信号，弹出到匹配的那一层为止
+    while stack:
+        name, started = stack.pop()
+        if name == template.name:
+            TEMPLATE_SECONDS.observe(time.perf_counter() - started, name)
+            break
+
+before_render_template.connect(_template_started, app)
+template_rendered.connect(_template_finished, app)
+
+# 按需剖析：管理员请求带 ?_profile=stats|collapsed 时剖析该请求，结果同时保存到 PROFILE_DIR
+PROFILE_DIR = os.path.join(app.root_path, 'profiles')
+init_request_profiling(app, lambda: session.get('user_type') == 'admin', PROFILE_DIR)
+
+# 持续采样剖析，由管理员开启和关闭
+stack_sampler = StackSampler()
+
+# 链路追踪：设置 LIBRARY_TRACE_FILE 后按 LIBRARY_TRACE_SAMPLE 的比例采样请求，
+# 以 Chrome Trace Event 格式追加到该文件
+TRACE_FILE = os.environ.get('LIBRARY_TRACE_FILE')
+TRACE_SAMPLE_RATE = float(os.environ.get('LIBRARY_TRACE_SAMPLE', '0.1'))
+tracer = Tracer(TRACE_FILE, TRACE_SAMPLE_RATE)
+init_request_tracing(app, tracer)
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_duration(response):
+    # 流式响应只计到响应头发出为止，页面主体的耗时见模板渲染直方图
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    REQUEST_SECONDS.observe(time.perf_counter() - g.request_started, route, request.method, response.status_code)
+    return response
+
 # 数据文件路径
 DATA_FILE = 'library_data.json'
 
+# 多进程部署时各 worker 共享的 SQLite 文件，未设置则为单进程模式
+SHARED_DB = os.environ.get('LIBRARY_SHARED_DB')
+
+# 逾期罚款记录的 SQLite 文件，以及后台批量计算的间隔（秒）
+FINES_DB = os.environ.get('LIBRARY_FINES_DB', 'library_fines.db')
+FINE_INTERVAL_SECONDS = int(os.environ.get('LIBRARY_FINE_INTERVAL', '3600'))
+
+# 到期提醒的发件箱 SQLite 文件和投递方式（memory 或 file:路径）
+REMINDER_DB = os.environ.get('LIBRARY_REMINDER_DB', 'library_reminders.db')
+REMINDER_SINK = os.environ.get('LIBRARY_REMINDER_SINK', 'memory')
+
+# 借阅历史（按月分区）和流通计数的 SQLite 文件
+HISTORY_DB = os.environ.get('LIBRARY_HISTORY_DB', 'library_history.db')
+
+# 热门借阅排行的窗口（天）和每个窗口展示的条数
+TRENDING_WINDOWS = {'week': 7, 'month': 30}
+TRENDING_SIZE = 10
+
+# “借过这本书的读者也借了”：推荐条数，以及后台全量重建推荐索引的间隔（秒）
+RECOMMENDATION_SIZE = 5
+RECOMMEND_INTERVAL_SECONDS = int(os.environ.get('LIBRARY_RECOMMEND_INTERVAL', '86400'))
+
+# 书名找不到时给出的相近书名条数，搜索结果最多列出的书名数
+SUGGESTION_SIZE = 3
+SEARCH_LIMIT = 50
+
+# 渲染片段缓存容量（条目数）
+FRAGMENT_CACHE_SIZE = 64
+
+# 实时推送：每个客户端最多积压的事件数，以及等待事件的轮询间隔和心跳间隔（秒）
+EVENT_QUEUE_SIZE = 100
+EVENT_POLL_SECONDS = 1
+EVENT_KEEPALIVE_SECONDS = 15
+
+# 预约：等待中的预约有效天数（与前端一致），到书后为预约读者保留的天数
+RESERVATION_DAYS = 7
+HOLD_DAYS = 3
+
 # 导入原有的类
+class Copy:
+    """出版物的一册实体馆藏，编号从 1 开始"""
+    __slots__ = ('publication', 'number', 'borrower', 'borrowed_at', 'due_date')
+
+    def __init__(self, publication: 'Publication', number: int) -> None:
+        self.publication = publication
+        self.number = number
+        self.borrower = None
+        self.borrowed_at = None
+        self.due_date = None
+
+    @property
+    def title(self) -> str:
+        return self.publication.title
+
 class Publication:
-    def __init__(self, title: str) -> None:
+    def __init__(self, title: str, copies: int = 1) -> None:
         self.title = title
-        self._is_borrowed = False
-        self._borrower = None
-        self._due_date = None
+        self._library = None
+        self._copies = []
+        # 在馆的副本：编号 -> 副本；借出的副本：读者 ID -> 副本（同一读者同一出版物只借一册）
+        self._free = {}
+        self._loans = {}
+        # 为预约读者保留的在馆副本：读者 ID -> 保留截止时间，保留不指定具体哪一册
+        self._holds = {}
+        self.add_copies(copies)
+
+    def add_copies(self, count: int) -> None:
+        for _ in range(count):
+            copy = Copy(self, len(self._copies) + 1)
+            self._copies.append(copy)
+            self._free[copy.number] = copy
 
     @property
-    def is_borrowed(self) -> bool:
-        return self._is_borrowed
+    def copy_count(self) -> int:
+        return len(self._copies)
 
     @property
-    def borrower(self):
-        return self._borrower
+    def available_copies(self) -> int:
+        """在馆且未为预约读者保留的册数"""
+        return len(self._free) - len(self._holds)
+
+    @property
+    def is_available(self) -> bool:
+        return len(self._free) > len(self._holds)
+
+    @property
+    def is_borrowed(self) -> bool:
+        """所有副本都已借出"""
+        return not self._free
 
     @property
-    def due_date(self):
-        return self._due_date
+    def loans(self) -> list:
+        """借出的副本"""
+        return list(self._loans.values())
+
+    def hold_until(self, reader_id: str) -> Optional[datetime]:
+        """为该读者保留的截止时间，没有保留时为 None"""
+        return self._holds.get(reader_id)
 
     def get_max_loan_days(self) -> int:
         raise NotImplementedError("子类必须实现此方法")
 
+    def check_borrow(self, reader) -> Optional[str]:
+        """reader 不能借阅时返回原因，不修改状态"""
+        if reader.reader_id in self._loans:
+            return f"您已借阅《{self.title}》"
+
+        if reader.reader_id not in self._holds and not self.is_available:
+            if self._free:
+                until = min(self._holds.values())
+                return f"书已为预约读者保留至{until.strftime('%Y-%m-%d')}"
+            first = min(self._loans.values(), key=lambda copy: copy.due_date)
+            due_date_str = first.due_date.strftime('%Y-%m-%d')
+            if len(self._copies) == 1:
+                return f"书已被{first.borrower.name}借出，预计{due_date_str}归还"
+            return f"书已全部借出（共{len(self._copies)}册），最早预计{due_date_str}归还"
+        return None
+
+    @tracer.traced('Publication.receive_borrow_message', 'domain')
     def receive_borrow_message(self, reader, days: int = None, **kwargs) -> tuple[bool, str]:
-        if self._is_borrowed:
-            due_date_str = self._due_date.strftime('%Y-%m-%d') if self._due_date else '未知'
-            return False, f"书已被{self._borrower.name}借出，预计{due_date_str}归还"
+        error = self.check_borrow(reader)
+        if error:
+            return False, error
         
         if days is None:
             days = self.get_max_loan_days()
@@ -44,19 +241,46 @@ class Publication:
         if days <= 0:
             return False, "借阅天数必须大于0"
         
-        self._is_borrowed = True
-        self._borrower = reader
-        self._due_date = datetime.now() + timedelta(days=days)
+        if reader.reader_id in self._holds:
+            self._clear_hold(reader.reader_id)
+        _, copy = self._free.popitem()
+        copy.borrower = reader
+        copy.borrowed_at = datetime.now()
+        copy.due_date = copy.borrowed_at + timedelta(days=days)
+        self._loans[reader.reader_id] = copy
         
-        return True, f"借阅成功，请于{self._due_date.strftime('%Y-%m-%d')}前归还"
+        return True, f"借阅成功，请于{copy.due_date.strftime('%Y-%m-%d')}前归还"
+
+    def _restore_loan(self, reader, due_date: datetime, number: int = None,
+                      borrowed_at: datetime = None) -> Optional[Copy]:
+        """按已知的借阅者和应还日期恢复借出状态（加载数据或重放事件时使用），优先使用指定编号的副本"""
+        if reader.reader_id in self._loans or not self._free:
+            return None
+        copy = self._free.pop(number, None)
+        if copy is None:
+            _, copy = self._free.popitem()
+        self._clear_hold(reader.reader_id)
+        copy.borrower = reader
+        copy.borrowed_at = borrowed_at
+        copy.due_date = due_date
+        self._loans[reader.reader_id] = copy
+        return copy
 
-    def receive_return_message(self) -> bool:
-        if self._is_borrowed:
-            self._is_borrowed = False
-            self._borrower = None
-            self._due_date = None
-            return True
-        return False
+    @tracer.traced('Publication.receive_return_message', 'domain')
+    def receive_return_message(self, reader) -> Optional[Copy]:
+        """归还读者借的副本，返回归还的副本；该读者没有借阅时返回 None"""
+        copy = self._loans.pop(reader.reader_id, None)
+        if copy is None:
+            return None
+        copy.borrower = None
+        copy.borrowed_at = None
+        copy.due_date = None
+        self._free[copy.number] = copy
+        return copy
+
+    def _clear_hold(self, reader_id: str) -> None:
+        if self._holds.pop(reader_id, None) is not None and self._library is not None:
+            self._library._forget_hold(self, reader_id)
 
     def get_description(self) -> str:
         raise NotImplementedError("子类必须实现此方法")
@@ -95,11 +319,44 @@ class Magazine(Publication):
         return f"《{self.title}》- 期号: {self.issue}, 出版商: {self.publisher} ({status})"
 
 class Library:
+    # 每种变更事件会影响的数据集合，用于维护集合版本号
+    EVENT_COLLECTIONS = {
+        'add': ('publications',),
+        'add_copies': ('publications',),
+        'remove': ('publications',),
+        'reader': ('readers',),
+        'borrow': ('publications', 'readers'),
+        'return': ('publications', 'readers'),
+        'reserve': ('reservations',),
+        'cancel_reservation': ('reservations',),
+        'hold': ('publications', 'reservations'),
+        'release_hold': ('publications', 'reservations'),
+    }
+
     def __init__(self, name: str) -> None:
         self.name = name
         self._publications = []
         self._readers = []
         self._admins = []
+        # 查找索引：(标题, 期号) -> 出版物，标题 -> 同名出版物列表，读者 ID -> 读者
+        self._publication_index = {}
+        self._title_index = {}
+        self._reader_index = {}
+        # 标题的三元组索引，用于拼写纠错和搜索；书名和作者 / 出版商的拼音索引，键同 _publication_index
+        self._title_search = TrigramIndex()
+        self._pinyin_search = PinyinIndex()
+        # 期刊系列：(标题, 出版商) -> 按期号排序的各期
+        self._magazine_series = SeriesIndex()
+        self._versions = {'publications': 0, 'readers': 0, 'reservations': 0}
+        self._listeners = []
+        # 预约：出版物 -> 预约队列，读者 ID -> 排队中 / 已到书保留的出版物
+        self._reservations = {}
+        self._reader_reservations = {}
+        self._reader_holds = {}
+        self._reservation_seq = 0
+        # 预约和保留的到期时间堆 (到期时间, 序号, 类型, 出版物, 读者 ID)，失效条目出堆时跳过
+        self._expiries = []
+        self._expiry_counter = itertools.count()
         self._create_initial_admin()
 
     def _create_initial_admin(self):
@@ -120,14 +377,30 @@ class Library:
     @property
     def admins(self): return self._admins.copy()
 
+    def version(self, collection: str) -> int:
+        """集合版本号，集合每变更一次加一"""
+        return self._versions[collection]
+
+    def subscribe(self, listener) -> None:
+        """注册变更监听器，每次变更后调用 listener(event, payload)"""
+        self._listeners.append(listener)
+
+    def _notify(self, event: str, payload: dict) -> None:
+        for collection in self.EVENT_COLLECTIONS[event]:
+            self._versions[collection] += 1
+        for listener in self._listeners:
+            listener(event, payload)
+
     def _add_publication(self, admin: 'Admin', publication: Publication) -> tuple[bool, str]:
         if not self._check_permission(admin):
             return False, "权限不足"
         
-        if any(p.title == publication.title for p in self._publications):
+        # 同一期刊的不同期号标题相同，按标题和期号判断是否重复
+        if self.get_publication(publication.title, getattr(publication, 'issue', None)):
             return False, "出版物已存在"
         
-        self._publications.append(publication)
+        self._attach_publication(publication)
+        self._notify('add', {**publication_ref(publication), 'publication': publication_to_dict(publication)})
         return True, "添加成功"
 
     def _remove_publication(self, admin: 'Admin', title: str) -> tuple[bool, str]:
@@ -136,29 +409,360 @@ class Library:
 
         for pub in self._publications:
             if pub.title == title:
-                self._publications.remove(pub)
+                if pub._loans:
+                    return False, "还有未归还的副本，不能移除"
+                self._drop_reservations(pub)
+                self._detach_publication(pub)
+                self._notify('remove', {**publication_ref(pub), 'copies': pub.copy_count})
                 return True, "移除成功"
         return False, "出版物不存在"
 
+    def _add_copies(self, admin: 'Admin', title: str, count: int, issue: str = None) -> tuple[bool, str]:
+        if not self._check_permission(admin):
+            return False, "权限不足"
+        if count <= 0:
+            return False, "册数必须大于0"
+
+        publication = self.get_publication(title, issue)
+        if not publication:
+            return False, "出版物不存在"
+        publication.add_copies(count)
+        self._notify('add_copies', {**publication_ref(publication), 'count': count,
+                                    'copies': publication.copy_count})
+        # 新到的副本先满足排队中的预约
+        self._hand_off(publication)
+        return True, f"《{title}》现有{publication.copy_count}册"
+
+    def _attach_publication(self, publication: Publication) -> None:
+        """加入出版物并更新索引（调用方已完成查重）"""
+        self._publications.append(publication)
+        self._publication_index[(publication.title, getattr(publication, 'issue', None))] = publication
+        same_title = self._title_index.setdefault(publication.title, [])
+        if not same_title:
+            self._title_search.add(publication.title)
+        same_title.append(publication)
+        self._pinyin_search.add((publication.title, getattr(publication, 'issue', None)), publication.title,
+                                getattr(publication, 'author', None) or getattr(publication, 'publisher', None))
+        if isinstance(publication, Magazine):
+            previous, latest = self._magazine_series.add((publication.title, publication.publisher),
+                                                         publication.issue, publication)
+            # 较新的一期成为最新期刊，上一期转为过刊；补录的旧期直接作为过刊
+            if latest is publication:
+                if previous is not None:
+                    previous.mark_as_archive()
+                publication.mark_as_latest()
+            else:
+                publication.mark_as_archive()
+        publication._library = self
+
+    def _detach_publication(self, publication: Publication) -> None:
+        self._publications.remove(publication)
+        del self._publication_index[(publication.title, getattr(publication, 'issue', None))]
+        same_title = self._title_index[publication.title]
+        same_title.remove(publication)
+        if not same_title:
+            del self._title_index[publication.title]
+            self._title_search.discard(publication.title)
+        self._pinyin_search.discard((publication.title, getattr(publication, 'issue', None)))
+        if isinstance(publication, Magazine):
+            # 移除的是最新一期时由上一期接替
+            latest = self._magazine_series.remove((publication.title, publication.publisher), publication.issue)
+            if publication._is_latest and latest is not None:
+                latest.mark_as_latest()
+        publication._library = None
+
     def _add_reader(self, admin: 'Admin', reader: 'Reader') -> tuple[bool, str]:
         if not self._check_permission(admin):
             return False, "权限不足"
             
-        if any(r.reader_id == reader.reader_id for r in self._readers):
+        if reader.reader_id in self._reader_index:
             return False, "读者ID已存在"
 
-        self._readers.append(reader)
+        self._append_reader(reader)
         return True, "添加成功"
 
-    def get_publication(self, title: str) -> Optional[Publication]:
-        return next((p for p in self._publications if p.title == title), None)
+    def _append_reader(self, reader: 'Reader') -> None:
+        """加入读者（调用方已完成校验）"""
+        self._insert_reader(reader)
+        self._notify('reader', {'reader_id': reader.reader_id, 'reader': reader_to_dict(reader)})
+
+    def _insert_reader(self, reader: 'Reader') -> None:
+        self._readers.append(reader)
+        self._reader_index[reader.reader_id] = reader
+
+    def _restore_loan(self, title: str, reader_id: str, due_date: datetime, issue: str = None,
+                      copy: int = None, borrowed_at: datetime = None) -> bool:
+        publication = self.get_publication(title, issue)
+        reader = self.get_reader(reader_id)
+        if not publication or not reader:
+            return False
+        restored = publication._restore_loan(reader, due_date, copy, borrowed_at)
+        if restored is None:
+            return False
+        reader._borrowed_items.append(restored)
+        return True
+
+    def apply_event(self, event: str, payload: dict) -> None:
+        """重放其他进程产生的变更事件，并照常通知本进程的监听器"""
+        if event == 'add':
+            if self.get_publication(payload['title'], payload.get('issue')):
+                return
+            self._attach_publication(publication_from_dict(payload['publication']))
+        elif event == 'add_copies':
+            # 载荷是增加后的总册数，重放多次结果相同
+            publication = self.get_publication(payload['title'], payload.get('issue'))
+            if not publication or publication.copy_count >= payload['copies']:
+                return
+            publication.add_copies(payload['copies'] - publication.copy_count)
+        elif event == 'remove':
+            publication = self.get_publication(payload['title'], payload.get('issue'))
+            if not publication:
+                return
+            self._drop_reservations(publication)
+            self._detach_publication(publication)
+        elif event == 'reader':
+            if self.get_reader(payload['reader_id']):
+                return
+            self._insert_reader(reader_from_dict(payload['reader']))
+        elif event == 'borrow':
+            if not self._restore_loan(payload['title'], payload['reader_id'],
+                                      datetime.fromisoformat(payload['due_date']), payload.get('issue'),
+                                      payload.get('copy'), optional_datetime(payload.get('borrowed_at'))):
+                return
+        elif event == 'return':
+            publication = self.get_publication(payload['title'], payload.get('issue'))
+            reader = self.get_reader(payload['reader_id'])
+            if not publication or not reader:
+                return
+            copy = publication.receive_return_message(reader)
+            if copy is None:
+                return
+            reader._borrowed_items.remove(copy)
+        elif event == 'reserve':
+            if not self._restore_reservation(payload):
+                return
+        elif event == 'cancel_reservation':
+            publication = self.get_publication(payload['title'], payload.get('issue'))
+            if not publication or not self._cancel_reservation(publication, payload['reader_id']):
+                return
+        elif event == 'hold':
+            if not self._restore_hold(payload):
+                return
+        elif event == 'release_hold':
+            publication = self.get_publication(payload['title'], payload.get('issue'))
+            if not publication or payload['reader_id'] not in publication._holds:
+                return
+            publication._clear_hold(payload['reader_id'])
+        self._notify(event, payload)
+
+    def reserve(self, reader: 'Reader', title: str, issue: str = None, priority: int = 0) -> tuple[bool, str]:
+        """预约没有可借副本的出版物；priority 越小越先出队，相同时先到先得"""
+        publication = self.get_publication(title, issue)
+        if not publication:
+            return False, self.not_found_message(title)
+        if reader.reader_id in publication._loans or reader.reader_id in publication._holds:
+            return False, f"《{title}》已在您名下"
+        if publication.is_available:
+            return False, f"《{title}》可以直接借阅，无需预约"
+        if reader.reader_id in self._reservations.get(publication, ()):
+            return False, "已预约该出版物"
+
+        now = datetime.now()
+        self._reservation_seq += 1
+        reservation = Reservation(priority, self._reservation_seq, reader.reader_id, now,
+                                  now + timedelta(days=RESERVATION_DAYS))
+        self._push_reservation(publication, reservation)
+        self._notify('reserve', {**publication_ref(publication), **reservation_to_dict(reservation)})
+        position = self._reservations[publication].position(reader.reader_id)
+        return True, f"预约成功，当前排在第{position}位"
+
+    def cancel_reservation(self, reader: 'Reader', title: str, issue: str = None) -> tuple[bool, str]:
+        """取消排队中的预约；已到书的预约取消后保留给下一位"""
+        publication = self.get_publication(title, issue)
+        if publication and reader.reader_id in publication._holds:
+            self._release_hold(publication, reader.reader_id, 'cancel')
+            return True, "已取消预约"
+        if not publication or not self._cancel_reservation(publication, reader.reader_id):
+            return False, "预约记录不存在"
+        self._notify('cancel_reservation', {**publication_ref(publication), 'reader_id': reader.reader_id,
+                                            'reason': 'cancel'})
+        return True, "已取消预约"
+
+    def reservations_of(self, reader_id: str) -> list:
+        """读者的预约 [(出版物, 排队位置, 保留截止时间)]，已到书的排在前面且排队位置为 None"""
+        held = [(p, None, p.hold_until(reader_id)) for p in self._reader_holds.get(reader_id, ())]
+        waiting = [(p, self._reservations[p].position(reader_id), None)
+                   for p in self._reader_reservations.get(reader_id, ())]
+        return sorted(held, key=lambda item: item[2]) + sorted(waiting, key=lambda item: item[0].title)
+
+    def reservation_count(self) -> int:
+        return sum(len(queue) for queue in self._reservations.values())
+
+    def next_expiry(self) -> Optional[datetime]:
+        """最早的预约或保留到期时间，可能是已失效的条目"""
+        return self._expiries[0][0] if self._expiries else None
+
+    def expire_reservations(self, now: datetime = None) -> int:
+        """处理到期的预约和保留，返回处理的数量"""
+        now = now or datetime.now()
+        expired = 0
+        while self._expiries and self._expiries[0][0] <= now:
+            when, _, kind, publication, reader_id = heapq.heappop(self._expiries)
+            if kind == 'hold':
+                if publication.hold_until(reader_id) == when:
+                    self._release_hold(publication, reader_id, 'expired')
+                    expired += 1
+            else:
+                queue = self._reservations.get(publication)
+                reservation = queue.get(reader_id) if queue else None
+                if reservation and reservation.expires_at == when:
+                    self._cancel_reservation(publication, reader_id)
+                    self._notify('cancel_reservation', {**publication_ref(publication), 'reader_id': reader_id,
+                                                        'reason': 'expired'})
+                    expired += 1
+        return expired
+
+    def _hand_off(self, publication: Publication) -> None:
+        """出版物有空闲副本时依次保留给仍有借阅额度的预约读者，每人一册"""
+        now = datetime.now()
+
+        def eligible(reservation: Reservation) -> bool:
+            reader = self.get_reader(reservation.reader_id)
+            return reader is not None and reader.get_remaining_quota() > 0 and reservation.expires_at > now \
+                and reader.reader_id not in publication._loans
+
+        while publication.is_available:
+            queue = self._reservations.get(publication)
+            reservation = queue.pop(eligible) if queue else None
+            if reservation is None:
+                return
+            until = now + timedelta(days=HOLD_DAYS)
+            self._forget_reservation(publication, reservation.reader_id)
+            self._set_hold(publication, reservation.reader_id, until)
+            self._notify('hold', {**publication_ref(publication), 'reader_id': reservation.reader_id,
+                                  'hold_until': until.isoformat()})
 
+    def _release_hold(self, publication: Publication, reader_id: str, reason: str) -> None:
+        publication._clear_hold(reader_id)
+        self._notify('release_hold', {**publication_ref(publication), 'reader_id': reader_id, 'reason': reason})
+        self._hand_off(publication)
+
+    def _push_reservation(self, publication: Publication, reservation: Reservation) -> None:
+        self._reservations.setdefault(publication, ReservationQueue()).push(reservation)
+        self._reader_reservations.setdefault(reservation.reader_id, set()).add(publication)
+        heapq.heappush(self._expiries, (reservation.expires_at, next(self._expiry_counter), 'reservation',
+                                        publication, reservation.reader_id))
+
+    def _cancel_reservation(self, publication: Publication, reader_id: str) -> bool:
+        queue = self._reservations.get(publication)
+        if not queue or queue.cancel(reader_id) is None:
+            return False
+        self._forget_reservation(publication, reader_id)
+        return True
+
+    def _forget_reservation(self, publication: Publication, reader_id: str) -> None:
+        publications = self._reader_reservations.get(reader_id)
+        if publications is not None:
+            publications.discard(publication)
+            if not publications:
+                del self._reader_reservations[reader_id]
+        queue = self._reservations.get(publication)
+        if queue is not None and not queue:
+            del self._reservations[publication]
+
+    def _set_hold(self, publication: Publication, reader_id: str, until: datetime) -> None:
+        publication._holds[reader_id] = until
+        self._reader_holds.setdefault(reader_id, set()).add(publication)
+        heapq.heappush(self._expiries, (until, next(self._expiry_counter), 'hold', publication, reader_id))
+
+    def _forget_hold(self, publication: Publication, reader_id: str) -> None:
+        publications = self._reader_holds.get(reader_id)
+        if publications is not None:
+            publications.discard(publication)
+            if not publications:
+                del self._reader_holds[reader_id]
+
+    def _drop_reservations(self, publication: Publication) -> None:
+        """出版物下架时丢弃它的预约和保留（由下架事件隐含，不单独通知）"""
+        queue = self._reservations.pop(publication, None)
+        for reservation in queue.entries() if queue else ():
+            self._forget_reservation(publication, reservation.reader_id)
+        for reader_id in list(publication._holds):
+            publication._clear_hold(reader_id)
+
+    def _restore_reservation(self, payload: dict) -> bool:
+        """按已知的预约记录恢复排队（加载数据或重放事件时使用）"""
+        publication = self.get_publication(payload['title'], payload.get('issue'))
+        if not publication or payload['reader_id'] in self._reservations.get(publication, ()):
+            return False
+        reservation = reservation_from_dict(payload)
+        self._reservation_seq = max(self._reservation_seq, reservation.seq)
+        self._push_reservation(publication, reservation)
+        return True
+
+    def _restore_hold(self, payload: dict) -> bool:
+        """按已知的保留记录恢复到书保留，读者的排队预约随之出队"""
+        publication = self.get_publication(payload['title'], payload.get('issue'))
+        reader = self.get_reader(payload['reader_id'])
+        if not publication or not reader or not publication.is_available \
+                or reader.reader_id in publication._holds or reader.reader_id in publication._loans:
+            return False
+        self._cancel_reservation(publication, reader.reader_id)
+        self._set_hold(publication, reader.reader_id, datetime.fromisoformat(payload['hold_until']))
+        return True
+
+    @tracer.traced('Library.get_publication', 'lookup')
+    def get_publication(self, title: str, issue: str = None) -> Optional[Publication]:
+        """按标题查找出版物；期刊可再指定期号，不指定时返回该系列的最新一期"""
+        if issue is not None:
+            return self._publication_index.get((title, issue))
+        same_title = self._title_index.get(title)
+        if not same_title:
+            return None
+        first = same_title[0]
+        if isinstance(first, Magazine):
+            return self._magazine_series.latest((title, first.publisher))
+        return first
+
+    def magazine_issues(self, title: str, publisher: str) -> list:
+        """期刊系列的各期，从旧到新"""
+        return self._magazine_series.issues((title, publisher))
+
+    @property
+    def pinyin_search_available(self) -> bool:
+        """是否安装了 pypinyin；未安装时拼音索引为空"""
+        return self._pinyin_search.available
+
+    @tracer.traced('Library.suggest_titles', 'lookup')
+    def suggest_titles(self, title: str, n: int = SUGGESTION_SIZE) -> list:
+        """与 title 拼写最接近的馆藏书名"""
+        return [t for t, _ in self._title_search.suggest(title, n)]
+
+    @tracer.traced('Library.search_publications', 'lookup')
+    def search_publications(self, query: str) -> list:
+        """书名含有 query 的出版物，其次是书名或作者 / 出版商的拼音匹配 query 的，最后是书名拼写相近的"""
+        titles = self._title_search.search(query, SEARCH_LIMIT)
+        found = [p for t in titles for p in self._title_index.get(t, ())]
+        found += [self._publication_index[key] for key in self._pinyin_search.search(query, SEARCH_LIMIT)]
+        found += [p for t in self.suggest_titles(query) for p in self._title_index.get(t, ())]
+        return list(dict.fromkeys(found))
+
+    def not_found_message(self, title: str) -> str:
+        message = f"图书馆没有《{title}》"
+        suggestions = self.suggest_titles(title)
+        if suggestions:
+            message += "，您要找的是不是" + "、".join(f"《{t}》" for t in suggestions) + "？"
+        return message
+
+    @tracer.traced('Library.get_available_publications', 'lookup')
     def get_available_publications(self):
-        return [p for p in self._publications if not p.is_borrowed]
+        return [p for p in self._publications if p.is_available]
 
+    @tracer.traced('Library.get_reader', 'lookup')
     def get_reader(self, reader_id: str) -> Optional['Reader']:
-        return next((r for r in self._readers if r.reader_id == reader_id), None)
+        return self._reader_index.get(reader_id)
 
+    @tracer.traced('Library.get_admin', 'lookup')
     def get_admin(self, admin_id: str, password: str) -> Optional['Admin']:
         return next((a for a in self._admins if a.admin_id == admin_id and a.password == password), None)
 
@@ -175,6 +779,9 @@ class Admin:
     def remove_publication(self, title: str) -> tuple[bool, str]:
         return self.library._remove_publication(self, title)
 
+    def add_copies(self, title: str, count: int = 1, issue: str = None) -> tuple[bool, str]:
+        return self.library._add_copies(self, title, count, issue)
+
     def register_reader(self, reader: 'Reader') -> tuple[bool, str]:
         return self.library._add_reader(self, reader)
 
@@ -190,128 +797,310 @@ class Reader:
     def borrowed_items(self):
         return self._borrowed_items.copy()
 
-    def send_borrow_message(self, library: Library, title: str, days: int = 14, **kwargs) -> tuple[bool, str]:
+    @tracer.traced('Reader.send_borrow_message', 'domain')
+    def send_borrow_message(self, library: Library, title: str, days: int = None, issue: str = None,
+                            **kwargs) -> tuple[bool, str]:
+        """days 为 None 时按出版物类型的最长借期借出（最新一期期刊 7 天，图书和过刊 14 天）；
+        期刊不指定 issue 时借最新一期"""
         if len(self._borrowed_items) >= self._max_borrow_limit:
             return False, f"已达到最大借阅数量（{self._max_borrow_limit}本）"
         
-        publication = library.get_publication(title)
+        publication = library.get_publication(title, issue)
         
         if not publication:
-            return False, f"图书馆没有《{title}》"
+            return False, library.not_found_message(title)
         
         success, message = publication.receive_borrow_message(self, days, **kwargs)
         
         if success:
-            self._borrowed_items.append(publication)
+            self._record_borrow(library, publication)
         
         return success, message
 
+    @tracer.traced('Reader.send_batch_borrow_message', 'domain')
+    def send_batch_borrow_message(self, library: Library, titles: list, days: int = None) -> tuple[bool, str]:
+        """一次借阅多本：先逐本校验，额度只检查一次，全部可借才借出，否则一本都不借
+
+        titles 的每一项是书名或 (书名, 期号)，期刊只给书名时借最新一期；days 为 None 时
+        每本按各自类型的最长借期借出。
+        """
+        items = self._checkout_items(titles)
+        if not items:
+            return False, "请至少填写一本书名"
+        if days is not None and days <= 0:
+            return False, "借阅天数必须大于0"
+
+        publications = []
+        errors = []
+        for title, issue in items:
+            publication = library.get_publication(title, issue)
+            if not publication:
+                if issue is not None and library.get_publication(title):
+                    errors.append(f"图书馆没有《{title}》（{issue}）")
+                else:
+                    errors.append(library.not_found_message(title))
+                continue
+            # 只给书名和同时给出最新期号的两项是同一期
+            if publication in publications:
+                continue
+            error = publication.check_borrow(self)
+            if error:
+                errors.append(f"《{title}》：{error}")
+            else:
+                publications.append(publication)
+        if errors:
+            return False, "未借出任何图书：" + "；".join(errors)
+        if len(self._borrowed_items) + len(publications) > self._max_borrow_limit:
+            return False, f"超出借阅额度（{self._max_borrow_limit}本），最多还能借{self.get_remaining_quota()}本"
+
+        # 按固定顺序借出，多进程下事件日志中的顺序与输入顺序无关
+        publications.sort(key=lambda p: (p.title, getattr(p, 'issue', '')))
+        for publication in publications:
+            publication.receive_borrow_message(self, days)
+            self._record_borrow(library, publication)
+        return True, f"成功借阅{len(publications)}本：" + "、".join(
+            f"《{p.title}》" + (f"（{p.issue}）" if isinstance(p, Magazine) else "") for p in publications)
+
+    @staticmethod
+    def _checkout_items(titles: list) -> list:
+        """批量借还的各项统一为 (书名, 期号)，只给书名时期号为 None；去掉重复项"""
+        return list(dict.fromkeys((title, None) if isinstance(title, str) else tuple(title) for title in titles))
+
+    def _record_borrow(self, library: Library, publication: Publication) -> None:
+        copy = publication._loans[self.reader_id]
+        self._borrowed_items.append(copy)
+        library._notify('borrow', {
+            **publication_ref(publication),
+            'reader_id': self.reader_id,
+            'copy': copy.number,
+            'borrowed_at': copy.borrowed_at.isoformat(),
+            'due_date': copy.due_date.isoformat()
+        })
+
     def get_remaining_quota(self) -> int:
         return self._max_borrow_limit - len(self._borrowed_items)
 
-    def send_return_message(self, title: str) -> tuple[bool, str]:
-        publication_to_return = None
+    def _find_borrowed(self, title: str, issue: str = None) -> Optional[Copy]:
+        """借阅的副本；期刊不指定 issue 时取最早借的一期"""
         for item in self._borrowed_items:
-            if item.title == title:
-                publication_to_return = item
-                break
+            if item.title == title and (issue is None or getattr(item.publication, 'issue', None) == issue):
+                return item
+        return None
+
+    @tracer.traced('Reader.send_return_message', 'domain')
+    def send_return_message(self, title: str, issue: str = None) -> tuple[bool, str]:
+        copy_to_return = self._find_borrowed(title, issue)
         
-        if not publication_to_return:
+        if not copy_to_return:
             return False, f"没有借阅《{title}》"
         
-        result = publication_to_return.receive_return_message()
-
-        if result:
-            self._borrowed_items.remove(publication_to_return)
+        if self._return_copy(copy_to_return):
             return True, f"成功归还《{title}》"
         else:
             return False, "归还失败"
 
+    @tracer.traced('Reader.send_batch_return_message', 'domain')
+    def send_batch_return_message(self, titles: list) -> tuple[bool, str]:
+        """一次归还多本，其中有未借阅的书时一本都不还
+
+        titles 的每一项是书名或 (书名, 期号)，同一期刊借了多期时用期号区分。
+        """
+        items = self._checkout_items(titles)
+        if not items:
+            return False, "请至少填写一本书名"
+        copies = [self._find_borrowed(title, issue) for title, issue in items]
+        missing = [item for item, copy in zip(items, copies) if copy is None]
+        if missing:
+            return False, "未归还任何图书：" + "；".join(
+                f"没有借阅《{title}》" + (f"（{issue}）" if issue else "") for title, issue in missing)
+
+        # 只给书名和给出期号的两项可能是同一册
+        copies = sorted(set(copies), key=lambda c: (c.title, getattr(c.publication, 'issue', '')))
+        for copy in copies:
+            self._return_copy(copy)
+        return True, f"成功归还{len(copies)}本：" + "、".join(f"《{c.title}》" for c in copies)
+
+    def _return_copy(self, copy_to_return: Copy) -> bool:
+        publication_to_return = copy_to_return.publication
+        borrowed_at = copy_to_return.borrowed_at
+        due_date = copy_to_return.due_date
+        if not publication_to_return.receive_return_message(self):
+            return False
+
+        self._borrowed_items.remove(copy_to_return)
+        if publication_to_return._library:
+            publication_to_return._library._notify('return', {
+                **publication_ref(publication_to_return),
+                'reader_id': self.reader_id,
+                'copy': copy_to_return.number,
+                'borrowed_at': borrowed_at.isoformat() if borrowed_at else None,
+                'due_date': due_date.isoformat(),
+                'returned_at': datetime.now().isoformat()
+            })
+            # 有人预约时直接保留给下一位，不再开放给所有人抢借
+            publication_to_return._library._hand_off(publication_to_return)
+        return True
+
+# 数据序列化函数
+def publication_ref(p: Publication) -> dict:
+    """在事件和借阅记录中引用出版物：标题，期刊另加期号"""
+    if isinstance(p, Magazine):
+        return {'title': p.title, 'issue': p.issue}
+    return {'title': p.title}
+
+def publication_to_dict(p: Publication) -> dict:
+    if isinstance(p, Book):
+        return {
+            'type': 'book',
+            'title': p.title,
+            'author': p.author,
+            'isbn': p.isbn,
+            'category': p.category,
+            'copies': p.copy_count
+        }
+    return {
+        'type': 'magazine',
+        'title': p.title,
+        'issue': p.issue,
+        'publisher': p.publisher,
+        'is_latest': p._is_latest,
+        'copies': p.copy_count
+    }
+
+def publication_from_dict(data: dict) -> Publication:
+    if data['type'] == 'book':
+        publication = Book(data['title'], data['author'], data['isbn'], data['category'])
+    else:
+        publication = Magazine(data['title'], data['issue'], data['publisher'])
+        if data.get('is_latest', False):
+            publication.mark_as_latest()
+    publication.add_copies(data.get('copies', 1) - 1)
+    return publication
+
+def reader_to_dict(r: Reader) -> dict:
+    return {
+        'name': r.name,
+        'reader_id': r.reader_id,
+        'password': r.password,
+        'max_borrow_limit': r._max_borrow_limit
+    }
+
+def reader_from_dict(data: dict) -> Reader:
+    return Reader(data['name'], data['reader_id'], data['password'], data.get('max_borrow_limit', 3))
+
+def optional_datetime(text: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(text) if text else None
+
+def reservation_to_dict(r: Reservation) -> dict:
+    return {
+        'reader_id': r.reader_id,
+        'priority': r.priority,
+        'seq': r.seq,
+        'reserved_at': r.reserved_at.isoformat(),
+        'expires_at': r.expires_at.isoformat()
+    }
+
+def reservation_from_dict(data: dict) -> Reservation:
+    return Reservation(data.get('priority', 0), data['seq'], data['reader_id'],
+                       datetime.fromisoformat(data['reserved_at']), datetime.fromisoformat(data['expires_at']))
+
 # 数据持久化函数
-def save_data():
-    """保存数据到JSON文件"""
+@PERSISTENCE_SECONDS.timed('save_data')
+@tracer.traced('save_data', 'persistence')
+def save_data(target: Optional[Library] = None, path: Optional[str] = None):
+    """保存数据到JSON文件，默认保存全局图书馆到 DATA_FILE"""
+    target = target or library
+    path = path or DATA_FILE
     data = {
-        'readers': [
+        'readers': [reader_to_dict(r) for r in target._readers],
+        'publications': [publication_to_dict(p) for p in target._publications],
+        'loans': [
             {
-                'name': r.name,
-                'reader_id': r.reader_id,
-                'password': r.password,
-                'max_borrow_limit': r._max_borrow_limit
+                **publication_ref(p),
+                'reader_id': reader_id,
+                'copy': copy.number,
+                'borrowed_at': copy.borrowed_at.isoformat() if copy.borrowed_at else None,
+                'due_date': copy.due_date.isoformat()
             }
-            for r in library._readers
+            for p in target._publications for reader_id, copy in p._loans.items()
         ],
-        'publications': [
-            {
-                'type': 'book',
-                'title': p.title,
-                'author': p.author,
-                'isbn': p.isbn,
-                'category': p.category
-            }
-            for p in library._publications if isinstance(p, Book)
-        ] + [
-            {
-                'type': 'magazine',
-                'title': p.title,
-                'issue': p.issue,
-                'publisher': p.publisher,
-                'is_latest': p._is_latest
-            }
-            for p in library._publications if isinstance(p, Magazine)
+        'reservations': [
+            {**publication_ref(p), **reservation_to_dict(r)}
+            for p, queue in target._reservations.items() for r in queue.entries()
+        ],
+        'holds': [
+            {**publication_ref(p), 'reader_id': reader_id, 'hold_until': p.hold_until(reader_id).isoformat()}
+            for reader_id, publications in target._reader_holds.items() for p in publications
         ]
     }
-    
-    with open(DATA_FILE, 'w', encoding='utf-8') as f:
+    if shared_store is not None and target is library:
+        # 快照对应的共享变更日志位置，启动时从这里继续追平
+        data['log_seq'] = shared_store.last_seq
+
+    # 先写临时文件再替换，避免其他进程读到写了一半的文件
+    tmp_file = path + '.tmp'
+    with open(tmp_file, 'w', encoding='utf-8') as f:
         json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_file, path)
 
-def load_data():
+@PERSISTENCE_SECONDS.timed('load_data')
+def load_data(path: Optional[str] = None):
     """从JSON文件加载数据"""
-    if not os.path.exists(DATA_FILE):
+    path = path or DATA_FILE
+    if not os.path.exists(path):
         return None
     
     try:
-        with open(DATA_FILE, 'r', encoding='utf-8') as f:
+        with open(path, 'r', encoding='utf-8') as f:
             return json.load(f)
     except:
         return None
 
+# 单进程模式下串行化修改和保存的锁
+_mutation_lock = threading.RLock()
+
+def mutation():
+    """修改图书馆数据的上下文
+
+    多进程模式下持有共享存储的写锁，进入时先追平其他进程的变更；
+    单进程模式下持有进程内的锁，避免并发借阅同一本书或同时写数据文件。
+    """
+    if shared_store is None:
+        return _mutation_lock
+    return shared_store.transaction()
+
+startup_timer.mark('import')
+
 # 初始化图书馆
 library = Library("图书馆管理系统")
 
+# 多进程模式：各 worker 通过共享的 SQLite 变更日志同步数据
+shared_store = SharedStore(SHARED_DB) if SHARED_DB else None
+
 # 尝试加载已保存的数据
 saved_data = load_data()
+startup_timer.mark('parse')
 
 if saved_data:
     # 加载读者数据
     for reader_data in saved_data.get('readers', []):
-        reader = Reader(
-            reader_data['name'],
-            reader_data['reader_id'],
-            reader_data['password'],
-            reader_data.get('max_borrow_limit', 3)
-        )
-        library._readers.append(reader)
+        library._append_reader(reader_from_dict(reader_data))
     
     # 加载出版物数据
     admin = library.admins[0]
     for pub_data in saved_data.get('publications', []):
-        if pub_data['type'] == 'book':
-            book = Book(
-                pub_data['title'],
-                pub_data['author'],
-                pub_data['isbn'],
-                pub_data['category']
-            )
-            admin.add_publication(book)
-        elif pub_data['type'] == 'magazine':
-            magazine = Magazine(
-                pub_data['title'],
-                pub_data['issue'],
-                pub_data['publisher']
-            )
-            if pub_data.get('is_latest', False):
-                magazine.mark_as_latest()
-            admin.add_publication(magazine)
+        admin.add_publication(publication_from_dict(pub_data))
+
+    # 恢复借阅状态
+    for loan in saved_data.get('loans', []):
+        library._restore_loan(loan['title'], loan['reader_id'], datetime.fromisoformat(loan['due_date']),
+                              loan.get('issue'), loan.get('copy'), optional_datetime(loan.get('borrowed_at')))
+
+    # 恢复预约队列和到书保留
+    for row in saved_data.get('reservations', []):
+        library._restore_reservation(row)
+    for row in saved_data.get('holds', []):
+        library._restore_hold(row)
 else:
     # 首次运行，添加示例数据
     admin = library.admins[0]
@@ -329,6 +1118,231 @@ else:
     # 保存初始数据
     save_data()
 
+startup_timer.mark('hydrate')
+
+# 以下构建派生结构：共享日志追平、缓存和事件订阅，计入 index 阶段
+if shared_store is not None:
+    shared_store.attach(library, saved_data.get('log_seq', 0) if saved_data else 0)
+
+# 管理员统计：按当前数据统计一遍，之后随变更事件增量更新
+library_stats = LibraryStats(library, Book, Magazine)
+library_stats.rebuild()
+library.subscribe(library_stats.on_event)
+
+# 出版物表格片段缓存，图书馆数据变更时按集合失效
+fragment_cache = FragmentCache(FRAGMENT_CACHE_SIZE)
+
+def _invalidate_fragments(event: str, payload: dict) -> None:
+    fragment_cache.invalidate(*Library.EVENT_COLLECTIONS[event])
+
+library.subscribe(_invalidate_fragments)
+
+# 可借状态变更的实时推送
+broadcaster = Broadcaster(EVENT_QUEUE_SIZE)
+
+def _publish_availability(event: str, payload: dict) -> None:
+    if event not in ('add', 'add_copies', 'remove', 'borrow', 'return', 'hold', 'release_hold'):
+        return
+    # 多册馆藏借出一册后可能仍然可借，按当前状态推送
+    publication = library.get_publication(payload['title'], payload.get('issue'))
+    available = event != 'remove' and publication is not None and publication.is_available
+    data = {'title': payload['title'], 'issue': payload.get('issue'), 'available': available}
+    if publication:
+        data['subtitle'] = publication.author if isinstance(publication, Book) else publication.publisher
+    broadcaster.publish(event, data)
+
+library.subscribe(_publish_availability)
+
+# 逾期罚款：后台线程定时批量计算在借记录，归还时确定最终金额
+fine_engine = FineEngine(FINES_DB)
+
+def _active_loans() -> list:
+    """在借记录快照，不加锁；读到正在归还、应还日期已清空的记录时跳过"""
+    loans = []
+    for reader in list(library._readers):
+        for copy in list(reader._borrowed_items):
+            due_date = copy.due_date
+            if due_date is not None:
+                loans.append((reader.reader_id, copy.title, getattr(copy.publication, 'issue', None), due_date))
+    return loans
+
+def _close_fine(event: str, payload: dict) -> None:
+    if event == 'return' and 'due_date' in payload:
+        fine_engine.close_loan(payload['reader_id'], payload['title'], payload.get('issue'),
+                               datetime.fromisoformat(payload['due_date']),
+                               datetime.fromisoformat(payload['returned_at']))
+
+library.subscribe(_close_fine)
+
+# 到期提醒：借阅时放入时间轮，后台线程批量写入发件箱并投递
+def _loan_active(reader_id: str, title: str, issue, due_date: datetime) -> bool:
+    reader = library.get_reader(reader_id)
+    return reader is not None and any(
+        copy.title == title and getattr(copy.publication, 'issue', None) == issue and copy.due_date == due_date
+        for copy in list(reader._borrowed_items))
+
+reminder_scheduler = ReminderScheduler(Outbox(REMINDER_DB), make_sink(REMINDER_SINK), _loan_active)
+
+def _schedule_reminder(event: str, payload: dict) -> None:
+    if event == 'borrow':
+        reminder_scheduler.schedule_loan(payload['reader_id'], payload['title'], payload.get('issue'),
+                                         datetime.fromisoformat(payload['due_date']))
+
+library.subscribe(_schedule_reminder)
+
+# 借阅历史：归还时追加到当月分区并更新流通计数
+loan_history = LoanHistory(HISTORY_DB)
+
+def _record_history(event: str, payload: dict) -> None:
+    if event != 'return' or 'due_date' not in payload:
+        return
+    publication = library.get_publication(payload['title'], payload.get('issue'))
+    category = publication.category if isinstance(publication, Book) else '期刊'
+    loan_history.record(payload['reader_id'], payload['title'], payload.get('issue'), category,
+                        optional_datetime(payload.get('borrowed_at')), datetime.fromisoformat(payload['due_date']),
+                        datetime.fromisoformat(payload['returned_at']))
+
+library.subscribe(_record_history)
+
+# 热门借阅：按借阅事件流统计最近一周和一个月的排行，启动时用在借记录和借阅历史补齐窗口
+# 多跟踪一些候选，减少排名靠后的出版物被挤出造成的误差
+trending = TrendingCounter(TRENDING_WINDOWS, k=2 * TRENDING_SIZE)
+
+def _count_borrow(event: str, payload: dict) -> None:
+    if event == 'borrow':
+        trending.add((payload['title'], payload.get('issue')), optional_datetime(payload.get('borrowed_at')))
+
+library.subscribe(_count_borrow)
+
+_trending_since = datetime.now() - timedelta(days=max(TRENDING_WINDOWS.values()))
+for title, issue, borrowed_at in loan_history.borrowed_since(_trending_since):
+    trending.add((title, issue), borrowed_at)
+for reader in library._readers:
+    for copy in reader._borrowed_items:
+        if copy.borrowed_at is not None and copy.borrowed_at >= _trending_since:
+            trending.add((copy.title, getattr(copy.publication, 'issue', None)), copy.borrowed_at)
+
+# 共借推荐：后台线程用借阅历史和在借记录定时全量重建，两次重建之间随借阅增量更新
+co_borrow = CoBorrowIndex()
+
+def _reader_baskets() -> dict:
+    """读者 ID -> 借过的出版物，不加锁，与 _active_loans 相同"""
+    baskets = loan_history.reader_baskets()
+    for reader in list(library._readers):
+        for copy in list(reader._borrowed_items):
+            baskets.setdefault(reader.reader_id, []).append((copy.title, getattr(copy.publication, 'issue', None)))
+    return baskets
+
+def _count_co_borrow(event: str, payload: dict) -> None:
+    if event == 'borrow':
+        co_borrow.record(payload['reader_id'], (payload['title'], payload.get('issue')))
+
+library.subscribe(_count_co_borrow)
+
+def recommendations_for(reader: 'Reader') -> list:
+    """读者的推荐出版物，跳过已下架的"""
+    borrowed = [(copy.title, getattr(copy.publication, 'issue', None)) for copy in reader._borrowed_items]
+    publications = (library.get_publication(title, issue)
+                    for (title, issue), _ in co_borrow.recommend(reader.reader_id, RECOMMENDATION_SIZE, borrowed))
+    return [p for p in publications if p is not None]
+
+metrics_registry.register(CallbackMetric(
+    'library_publications', '馆藏出版物数量', lambda: len(library._publications)))
+metrics_registry.register(CallbackMetric(
+    'library_readers', '注册读者数量', lambda: len(library._readers)))
+metrics_registry.register(CallbackMetric(
+    'library_active_loans', '在借数量', lambda: library_stats.on_loan))
+metrics_registry.register(CallbackMetric(
+    'library_overdue_loans', '逾期未还数量', library_stats.overdue))
+metrics_registry.register(CallbackMetric(
+    'library_fragment_cache_hits_total', '片段缓存命中次数', lambda: fragment_cache.hits, 'counter'))
+metrics_registry.register(CallbackMetric(
+    'library_fragment_cache_misses_total', '片段缓存未命中次数', lambda: fragment_cache.misses, 'counter'))
+metrics_registry.register(CallbackMetric(
+    'library_event_subscribers', '实时推送连接数', broadcaster.client_count))
+metrics_registry.register(CallbackMetric(
+    'library_reservations', '排队中的预约数量', library.reservation_count))
+
+# 内存占用估算：实体之间互相引用，计算某类实体时遇到其他实体或日期即停止
+memory_accounting = MemoryAccounting()
+ENTITY_TYPES = (Publication, Reader, Admin, Library, datetime)
+
+def _publications_of(kind):
+    return [p for p in library._publications if type(p) is kind]
+
+memory_accounting.register('Book', lambda: estimate(_publications_of(Book), lambda p: deep_sizeof(p, ENTITY_TYPES)))
+memory_accounting.register('Magazine', lambda: estimate(_publications_of(Magazine),
+                                                         lambda p: deep_sizeof(p, ENTITY_TYPES)))
+memory_accounting.register('Reader', lambda: estimate(library._readers, lambda r: deep_sizeof(r, ENTITY_TYPES)))
+# 借阅记录本身只是副本上的应还日期，副本已计入出版物
+memory_accounting.register('loans', lambda: estimate([c for r in library._readers for c in r._borrowed_items],
+                                                      lambda c: sys.getsizeof(c.due_date)))
+# 索引的键和值都是实体上已有的对象，只计容器本身
+memory_accounting.register('indexes', lambda: estimate(
+    [library._publications, library._readers, library._admins, library._publication_index,
+     library._title_index, library._reader_index, library._magazine_series._order,
+     library._magazine_series._issues], sys.getsizeof))
+# 标题和拼音索引的大头是倒排表（片段 -> 条目编号集合）
+memory_accounting.register('title_search', lambda: estimate(list(library._title_search._postings.values()),
+                                                            sys.getsizeof))
+memory_accounting.register('pinyin_search', lambda: estimate(
+    list(library._pinyin_search._index._postings.values()), sys.getsizeof))
+memory_accounting.register('reservations', lambda: estimate(
+    list(library._reservations.values()), lambda q: deep_sizeof(q, ENTITY_TYPES)))
+memory_accounting.register('trending', lambda: estimate([trending], deep_sizeof))
+memory_accounting.register('recommendations', lambda: estimate(
+    [co_borrow._baskets, co_borrow._counts, co_borrow._neighbors], lambda index: deep_sizeof(index, ENTITY_TYPES)))
+memory_accounting.register('fragment_cache', lambda: estimate(fragment_cache.items(), deep_sizeof))
+
+# tracemalloc 快照，由管理员按需拍摄和比较
+memory_snapshots = SnapshotStore()
+
+startup_timer.mark('index')
+
+if not library.pinyin_search_available:
+    logging.getLogger('library.pinyin').warning('未安装 pypinyin，拼音和首字母搜索不可用（pip install -r requirements.txt）')
+metrics_registry.register(CallbackMetric(
+    'library_startup_phase_seconds', '启动各阶段耗时',
+    lambda: {(('phase', name),): seconds for name, seconds in startup_timer.phases.items()}))
+
+def render_fragment(template_name: str, collection: str, key: tuple = (), context=dict) -> Markup:
+    """渲染并缓存页面片段，缓存键包含集合版本号
+
+    context 是返回模板变量的函数，只在未命中缓存时调用，命中时不再扫描或复制馆藏列表。
+    """
+    cache_key = (collection, library.version(collection), template_name) + tuple(key)
+    html = fragment_cache.get_or_render(cache_key, lambda: render_template(template_name, **context()))
+    return Markup(html)
+
+@app.before_request
+def sync_shared_state():
+    """多进程模式下，处理请求前先应用其他 worker 产生的变更"""
+    if shared_store is not None:
+        shared_store.sync()
+
+@app.before_request
+def start_fine_engine():
+    """收到第一个请求时才启动后台线程（预先 fork 的 worker 中线程不会被继承）"""
+    fine_engine.start(_active_loans, FINE_INTERVAL_SECONDS)
+
+@app.before_request
+def start_reminders():
+    reminder_scheduler.start(_active_loans)
+
+@app.before_request
+def start_recommendations():
+    co_borrow.start(_reader_baskets, RECOMMEND_INTERVAL_SECONDS)
+
+@app.before_request
+def expire_reservations():
+    """处理到期的预约和保留；只看堆顶，没有到期项时不加锁"""
+    due = library.next_expiry()
+    if due is None or due > datetime.now():
+        return
+    with mutation():
+        if library.expire_reservations():
+            save_data()
+
 # 路由
 @app.route('/')
 def index():
@@ -347,17 +1361,18 @@ def register():
             flash('两次输入的密码不一致')
             return render_template('register.html')
         
-        # 检查读者ID是否已存在
-        if library.get_reader(reader_id):
-            flash('该读者ID已被注册')
-            return render_template('register.html')
-        
-        # 创建新读者（不需要管理员权限）
-        reader = Reader(name, reader_id, password)
-        library._readers.append(reader)
-        
-        # 保存数据
-        save_data()
+        with mutation():
+            # 检查读者ID是否已存在
+            if library.get_reader(reader_id):
+                flash('该读者ID已被注册')
+                return render_template('register.html')
+            
+            # 创建新读者（不需要管理员权限）
+            reader = Reader(name, reader_id, password)
+            library._append_reader(reader)
+            
+            # 保存数据
+            save_data()
         
         flash('注册成功！请登录')
         return redirect(url_for('login'))
@@ -402,9 +1417,141 @@ def admin_dashboard():
     if session.get('user_type') != 'admin':
         return redirect(url_for('login'))
     
-    publications = library.publications
+    # 流式输出前先取出提示消息，session 的修改要在响应头发出前完成
+    get_flashed_messages()
+    # 表格片段在流式输出到达时才渲染（或取缓存），页面头部可以先发出
+    publication_table = lambda: render_fragment('_publication_table.html', 'publications',
+                                                context=lambda: {'publications': library.publications})
     readers = library.readers
-    return render_template('admin_dashboard.html', publications=publications, readers=readers)
+    return stream_template('admin_dashboard.html', publication_table=publication_table, readers=readers,
+                           stats=library_stats.summary())
+
+@app.route('/admin/stats')
+def admin_stats():
+    """馆藏、借阅、读者和逾期的汇总，随变更增量维护"""
+    if session.get('user_type') != 'admin':
+        return redirect(url_for('login'))
+
+    return jsonify(library_stats.summary())
+
+@app.route('/admin/cache_stats')
+def cache_stats():
+    if session.get('user_type') != 'admin':
+        return redirect(url_for('login'))
+
+    return jsonify(fragment_cache.stats())
+
+@app.route('/admin/memory')
+def memory_report():
+    """各类实体的估算内存占用和已拍摄的 tracemalloc 快照"""
+    if session.get('user_type') != 'admin':
+        return redirect(url_for('login'))
+
+    report = memory_accounting.report()
+    report['tracemalloc'] = {'tracing': memory_snapshots.tracing, 'snapshots': memory_snapshots.list()}
+    return jsonify(report)
+
+@app.route('/admin/memory/snapshots', methods=['POST'])
+def take_memory_snapshot():
+    if session.get('user_type') != 'admin':
+        return redirect(url_for('login'))
+
+    return jsonify(memory_snapshots.take(request.form.get('label', '')))
+
+@app.route('/admin/memory/diff')
+def memory_snapshot_diff():
+    """?from=旧快照&to=新快照&key=lineno|filename|traceback&limit=30"""
+    if session.get('user_type') != 'admin':
+        return redirect(url_for('login'))
+
+    key_type = request.args.get('key', 'lineno')
+    if key_type not in ('lineno', 'filename', 'traceback'):
+        return jsonify({'error': f'不支持的 key：{key_type}'}), 400
+    try:
+        diff = memory_snapshots.diff(request.args.get('from', type=int), request.args.get('to', type=int),
+                                     key_type, request.args.get('limit', 30, type=int))
+    except KeyError:
+        return jsonify({'error': '快照不存在'}), 404
+    return jsonify({'from': request.args.get('from', type=int), 'to': request.args.get('to', type=int),
+                    'key': key_type, 'stats': diff})
+
+@app.route('/admin/memory/stop', methods=['POST'])
+def stop_memory_tracing():
+    """停止 tracemalloc 并丢弃快照，追踪期间内存分配会明显变慢"""
+    if session.get('user_type') != 'admin':
+        return redirect(url_for('login'))
+
+    memory_snapshots.stop()
+    return jsonify({'tracing': False})
+
+@app.route('/admin/fines')
+def fines_summary():
+    """罚款总额、罚款最多的读者和最近一次批量计算的情况，金额单位为分"""
+    if session.get('user_type') != 'admin':
+        return redirect(url_for('login'))
+
+    return jsonify(fine_engine.summary())
+
+@app.route('/admin/fines/assess', methods=['POST'])
+def assess_fines():
+    """立即在后台计算一次，不等待结果"""
+    if session.get('user_type') != 'admin':
+        return redirect(url_for('login'))
+
+    fine_engine.trigger()
+    return jsonify({'triggered': True}), 202
+
+@app.route('/admin/history')
+def history_report():
+    """流通报表：借阅排行、分类统计和最近 ?days=30 天每天归还的借阅数"""
+    if session.get('user_type') != 'admin':
+        return redirect(url_for('login'))
+
+    return jsonify(loan_history.report(request.args.get('days', 30, type=int), request.args.get('top', 10, type=int)))
+
+@app.route('/admin/history/<int:year>/<int:month>')
+def history_month(year, month):
+    """某个月归还的借阅明细"""
+    if session.get('user_type') != 'admin':
+        return redirect(url_for('login'))
+    if not 1 <= month <= 12:
+        return jsonify({'error': '月份应为 1-12'}), 400
+
+    return jsonify(loan_history.month(year, month, request.args.get('limit', 1000, type=int)))
+
+@app.route('/admin/reminders')
+def reminders_status():
+    """发件箱中各类提醒的待发送、已发送数量和最近一次调度的情况"""
+    if session.get('user_type') != 'admin':
+        return redirect(url_for('login'))
+
+    return jsonify({'outbox': reminder_scheduler.outbox.summary(), 'last_run': reminder_scheduler.last_run})
+
+@app.route('/admin/reminders/run', methods=['POST'])
+def run_reminders():
+    """立即在后台调度一次，不等待结果"""
+    if session.get('user_type') != 'admin':
+        return redirect(url_for('login'))
+
+    reminder_scheduler.trigger()
+    return jsonify({'triggered': True}), 202
+
+@app.route('/admin/recommendations')
+def recommendations_status():
+    """最近一次全量重建推荐索引的规模"""
+    if session.get('user_type') != 'admin':
+        return redirect(url_for('login'))
+
+    return jsonify({'last_build': co_borrow.last_build})
+
+@app.route('/admin/recommendations/rebuild', methods=['POST'])
+def rebuild_recommendations():
+    """立即在后台重建一次，不等待结果"""
+    if session.get('user_type') != 'admin':
+        return redirect(url_for('login'))
+
+    co_borrow.trigger()
+    return jsonify({'triggered': True}), 202
 
 @app.route('/admin/add_book', methods=['POST'])
 def add_book():
@@ -415,16 +1562,25 @@ def add_book():
     author = request.form.get('author')
     isbn = request.form.get('isbn')
     category = request.form.get('category')
+    copies = request.form.get('copies', 1, type=int)
     
-    admin = library.get_admin(session['user_id'], '')
+    admin = next((a for a in library.admins if a.admin_id == session['user_id']), None)
     if admin:
-        book = Book(title, author, isbn, category)
-        success, message = admin.add_publication(book)
+        with mutation():
+            if isinstance(library.get_publication(title), Book):
+                # 已有的图书再次入库视为增加副本
+                success, message = admin.add_copies(title, copies)
+            elif copies <= 0:
+                success, message = False, "册数必须大于0"
+            else:
+                book = Book(title, author, isbn, category)
+                book.add_copies(copies - 1)
+                success, message = admin.add_publication(book)
+            
+            # 保存数据
+            if success:
+                save_data()
         flash(message)
-        
-        # 保存数据
-        if success:
-            save_data()
     
     return redirect(url_for('admin_dashboard'))
 
@@ -434,9 +1590,24 @@ def reader_dashboard():
         return redirect(url_for('login'))
     
     reader = library.get_reader(session['user_id'])
-    publications = library.get_available_publications()
+    get_flashed_messages()
+    query = request.args.get('q', '').strip()
+    if query:
+        # 搜索词是片段缓存键的一部分，不同搜索各自缓存
+        publication_grid = lambda: render_fragment(
+            '_publication_grid.html', 'publications', ('q', query),
+            context=lambda: {'publications': [p for p in library.search_publications(query) if p.is_available]})
+    else:
+        publication_grid = lambda: render_fragment(
+            '_publication_grid.html', 'publications',
+            context=lambda: {'publications': library.get_available_publications()})
     
-    return render_template('reader_dashboard.html', reader=reader, publications=publications)
+    return stream_template('reader_dashboard.html', reader=reader, publication_grid=publication_grid, query=query,
+                           pinyin_search=library.pinyin_search_available,
+                           reservations=library.reservations_of(reader.reader_id) if reader else [],
+                           fine_cents=fine_engine.reader_total(reader.reader_id) if reader else 0,
+                           trending={name: trending.top(name)[:TRENDING_SIZE] for name in TRENDING_WINDOWS},
+                           recommendations=recommendations_for(reader) if reader else [])
 
 @app.route('/reader/borrow', methods=['POST'])
 def borrow_book():
@@ -444,10 +1615,14 @@ def borrow_book():
         return redirect(url_for('login'))
     
     title = request.form.get('title')
+    issue = request.form.get('issue') or None
     reader = library.get_reader(session['user_id'])
     
     if reader:
-        success, message = reader.send_borrow_message(library, title)
+        with mutation():
+            success, message = reader.send_borrow_message(library, title, issue=issue)
+            if success:
+                save_data()
         flash(message)
     
     return redirect(url_for('reader_dashboard'))
@@ -458,13 +1633,171 @@ def return_book():
         return redirect(url_for('login'))
     
     title = request.form.get('title')
+    issue = request.form.get('issue') or None
     reader = library.get_reader(session['user_id'])
     
     if reader:
-        success, message = reader.send_return_message(title)
+        with mutation():
+            success, message = reader.send_return_message(title, issue)
+            if success:
+                save_data()
         flash(message)
     
     return redirect(url_for('reader_dashboard'))
 
+def _parse_checkout_item(value: str) -> Optional[tuple]:
+    """已借图书列表的勾选项 [书名, 期号]，期号可以为 null；格式不对时返回 None"""
+    try:
+        item = json.loads(value)
+    except ValueError:
+        return None
+    if (isinstance(item, list) and len(item) == 2 and isinstance(item[0], str)
+            and (item[1] is None or isinstance(item[1], str))):
+        return item[0], item[1]
+    return None
+
+@app.route('/reader/checkout', methods=['POST'])
+def batch_checkout():
+    """一次借阅或归还多本（每行一个书名），全部成功或全部不做，只保存一次"""
+    if session.get('user_type') != 'reader':
+        return redirect(url_for('login'))
+
+    titles = [line.strip() for line in request.form.get('titles', '').splitlines() if line.strip()]
+    titles += request.form.getlist('title')
+    # 已借图书列表勾选的是 [书名, 期号]，同一期刊借了多期时能区分
+    items = [_parse_checkout_item(value) for value in request.form.getlist('item')]
+    if None in items:
+        flash('勾选的图书无效，请刷新页面后重试')
+        return redirect(url_for('reader_dashboard'))
+    titles += items
+    action = request.form.get('action', 'borrow')
+    reader = library.get_reader(session['user_id'])
+
+    if reader:
+        # 整批在同一个变更事务内完成，多进程模式下全部事件一起提交
+        with mutation():
+            if action == 'return':
+                success, message = reader.send_batch_return_message(titles)
+            else:
+                success, message = reader.send_batch_borrow_message(library, titles)
+            if success:
+                save_data()
+        flash(message)
+
+    return redirect(url_for('reader_dashboard'))
+
+@app.route('/reader/reserve', methods=['POST'])
+def reserve_book():
+    if session.get('user_type') != 'reader':
+        return redirect(url_for('login'))
+
+    title = request.form.get('title')
+    issue = request.form.get('issue') or None
+    reader = library.get_reader(session['user_id'])
+
+    if reader:
+        with mutation():
+            success, message = library.reserve(reader, title, issue)
+            if success:
+                save_data()
+        flash(message)
+
+    return redirect(url_for('reader_dashboard'))
+
+@app.route('/reader/cancel_reservation', methods=['POST'])
+def cancel_reservation():
+    if session.get('user_type') != 'reader':
+        return redirect(url_for('login'))
+
+    title = request.form.get('title')
+    issue = request.form.get('issue') or None
+    reader = library.get_reader(session['user_id'])
+
+    if reader:
+        with mutation():
+            success, message = library.cancel_reservation(reader, title, issue)
+            if success:
+                save_data()
+        flash(message)
+
+    return redirect(url_for('reader_dashboard'))
+
+@app.route('/admin/profiler')
+def profiler_status():
+    if session.get('user_type') != 'admin':
+        return redirect(url_for('login'))
+
+    return jsonify({'running': stack_sampler.running, 'samples': stack_sampler.samples,
+                    'interval': stack_sampler.interval})
+
+@app.route('/admin/profiler/start', methods=['POST'])
+def profiler_start():
+    if session.get('user_type') != 'admin':
+        return redirect(url_for('login'))
+
+    stack_sampler.reset()
+    stack_sampler.start()
+    return redirect(url_for('profiler_status'))
+
+@app.route('/admin/profiler/stop', methods=['POST'])
+def profiler_stop():
+    if session.get('user_type') != 'admin':
+        return redirect(url_for('login'))
+
+    stack_sampler.stop()
+    return redirect(url_for('profiler_status'))
+
+@app.route('/admin/profiler/collapsed')
+def profiler_collapsed():
+    """导出折叠栈，可用 flamegraph.pl 或 speedscope 生成火焰图"""
+    if session.get('user_type') != 'admin':
+        return redirect(url_for('login'))
+
+    return Response(stack_sampler.collapsed(), mimetype='text/plain',
+                    headers={'Content-Disposition': 'attachment; filename=library.collapsed'})
+
+@app.route('/metrics')
+def metrics():
+    return Response(metrics_registry.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/events')
+def events():
+    """可借状态变更的 Server-Sent Events 推送"""
+    if session.get('user_type') not in ('reader', 'admin'):
+        return redirect(url_for('login'))
+
+    def stream():
+        subscription = broadcaster.subscribe()
+        idle = 0
+        try:
+            yield f'retry: {EVENT_KEEPALIVE_SECONDS * 1000}\n\n'
+            while True:
+                if subscription.lagged:
+                    # 积压超过上限，让客户端刷新整页
+                    yield format_sse('resync', {})
+                    return
+                message = subscription.get(EVENT_POLL_SECONDS)
+                if message is not None:
+                    idle = 0
+                    yield message
+                    continue
+                # 多进程模式下其他 worker 的变更要在本进程追平后才会推送
+                if shared_store is not None:
+                    shared_store.sync()
+                idle += EVENT_POLL_SECONDS
+                if idle >= EVENT_KEEPALIVE_SECONDS:
+                    idle = 0
+                    yield ': keep-alive\n\n'
+        finally:
+            broadcaster.unsubscribe(subscription)
+
+    return Response(stream(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+startup_timer.mark_ready()
+
 if __name__ == '__main__':
+    # 导入时还没有配置日志，配置后补记启动耗时
+    logging.basicConfig(level=logging.INFO)
+    startup_timer.log()
     app.run(debug=True)
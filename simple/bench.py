@@ -0,0 +1,227 @@
+"""Library 核心性能基准
+
+在不同规模（默认 1k / 100k / 1M 个出版物）下测量查询、借还和持久化操作的
+吞吐量、p50/p99 延迟和峰值内存，结果写成 JSON，并可与保存的基线比较：
+任何一项超出容差即以非零状态码退出。
+
+    python bench.py                           # 运行并与 bench_baseline.json 比较
+    python bench.py --sizes 1000 10000        # 指定规模
+    python bench.py --save-baseline           # 把本次结果保存为新基线
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+from app import Book, Library, Magazine, Reader, load_data, save_data
+
+DEFAULT_SIZES = [1_000, 100_000, 1_000_000]
+DEFAULT_OUTPUT = 'bench_results.json'
+DEFAULT_BASELINE = 'bench_baseline.json'
+
+# 每个操作的计时预算（秒）与调用次数上下限
+DEFAULT_BUDGET = 1.0
+MIN_CALLS = 3
+MAX_CALLS = 10_000
+
+# 延迟或吞吐量比基线差超过该比例视为回归
+DEFAULT_TOLERANCE = 0.25
+
+# 读者数量为出版物数量的十分之一
+READERS_PER_PUBLICATION = 0.1
+
+
+def build_library(size: int, seed: int = 0) -> Library:
+    """构造含 size 个出版物的图书馆，直接加入索引以跳过逐条查重和事件通知"""
+    rng = random.Random(seed)
+    library = Library(f'bench-{size}')
+    for i in range(size):
+        if rng.random() < 0.8:
+            publication = Book(f'图书{i}', f'作者{i % 997}', f'978{i:010d}', f'分类{i % 50}')
+        else:
+            publication = Magazine(f'期刊{i}', f'20{i % 25:02d}-{i % 12 + 1:02d}', f'出版社{i % 97}')
+        library._attach_publication(publication)
+    for i in range(max(10, int(size * READERS_PER_PUBLICATION))):
+        library._insert_reader(Reader(f'读者{i}', f'R{i:08d}', 'password'))
+    return library
+
+
+def measure(func, budget: float, self_timed: bool = False) -> dict:
+    """在时间预算内重复调用 func，返回吞吐量和延迟分位数
+
+    self_timed 为 True 时 func 自己返回要计入的耗时（纳秒）。
+    """
+    gc.collect()
+    latencies = []
+    started = time.perf_counter()
+    while len(latencies) < MAX_CALLS:
+        if self_timed:
+            latencies.append(func())
+        else:
+            t0 = time.perf_counter_ns()
+            func()
+            latencies.append(time.perf_counter_ns() - t0)
+        if len(latencies) >= MIN_CALLS and time.perf_counter() - started >= budget:
+            break
+    elapsed = sum(latencies) / 1e9
+    latencies.sort()
+    return {
+        'calls': len(latencies),
+        'throughput': len(latencies) / elapsed if elapsed else float('inf'),
+        'p50_us': latencies[len(latencies) // 2] / 1e3,
+        'p99_us': latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] / 1e3,
+    }
+
+
+def peak_memory(func) -> int:
+    """单独调用一次 func 并返回其间新增的峰值内存（字节），与计时分开以免 tracemalloc 影响延迟"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return max(0, peak - base)
+
+
+# 借和还成对执行以保持库存不变，由操作函数自己返回要计入的那一半耗时
+SELF_TIMED = ('send_borrow_message', 'send_return_message')
+
+
+def make_operations(library: Library, data_file: str, seed: int = 0) -> dict:
+    rng = random.Random(seed)
+    titles = [p.title for p in library._publications]
+    reader_ids = [r.reader_id for r in library._readers]
+
+    def borrow_then_return(measure_borrow: bool):
+        def run():
+            reader = library._readers[rng.randrange(len(reader_ids))]
+            title = titles[rng.randrange(len(titles))]
+            if measure_borrow:
+                t0 = time.perf_counter_ns()
+                success, _ = reader.send_borrow_message(library, title)
+                elapsed = time.perf_counter_ns() - t0
+                if success:
+                    reader.send_return_message(title)
+            else:
+                success, _ = reader.send_borrow_message(library, title)
+                t0 = time.perf_counter_ns()
+                if success:
+                    reader.send_return_message(title)
+                elapsed = time.perf_counter_ns() - t0
+            return elapsed
+        return run
+
+    def misspelled_title():
+        title = titles[rng.randrange(len(titles))]
+        i = rng.randrange(len(title))
+        return title[:i] + '错' + title[i + 1:]
+
+    return {
+        'get_publication': lambda: library.get_publication(titles[rng.randrange(len(titles))]),
+        'suggest_titles': lambda: library.suggest_titles(misspelled_title()),
+        'get_reader': lambda: library.get_reader(reader_ids[rng.randrange(len(reader_ids))]),
+        'get_available_publications': library.get_available_publications,
+        'send_borrow_message': borrow_then_return(True),
+        'send_return_message': borrow_then_return(False),
+        'save_data': lambda: save_data(library, data_file),
+        'load_data': lambda: load_data(data_file),
+    }
+
+
+def run_size(size: int, budget: float, workdir: str) -> dict:
+    print(f'== {size} 个出版物 ==', flush=True)
+    build_started = time.perf_counter()
+    library = build_library(size)
+    results = {'build_seconds': time.perf_counter() - build_started}
+    data_file = os.path.join(workdir, f'bench-{size}.json')
+    save_data(library, data_file)
+
+    for name, func in make_operations(library, data_file).items():
+        stats = measure(func, budget, self_timed=name in SELF_TIMED)
+        stats['peak_bytes'] = peak_memory(func)
+        results[name] = stats
+        print(f"  {name:28s} {stats['throughput']:>12.1f}/s  p50 {stats['p50_us']:>12.1f}us  "
+              f"p99 {stats['p99_us']:>12.1f}us  peak {stats['peak_bytes'] / 1024:>10.1f}KiB", flush=True)
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """返回所有超出容差的回归项描述"""
+    regressions = []
+    for size, operations in results['results'].items():
+        base_operations = baseline.get('results', {}).get(size, {})
+        for name, stats in operations.items():
+            base = base_operations.get(name)
+            if not isinstance(stats, dict) or not isinstance(base, dict):
+                continue
+            for metric in ('p50_us', 'p99_us'):
+                if base[metric] and stats[metric] > base[metric] * (1 + tolerance):
+                    regressions.append(f'{size} {name} {metric}: {base[metric]:.1f} -> {stats[metric]:.1f}')
+            if stats['throughput'] < base['throughput'] * (1 - tolerance):
+                regressions.append(
+                    f"{size} {name} throughput: {base['throughput']:.1f} -> {stats['throughput']:.1f}")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Library 核心性能基准')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--budget', type=float, default=DEFAULT_BUDGET, help='每个操作的计时预算（秒）')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT)
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument('--save-baseline', action='store_true', help='将本次结果保存为基线')
+    args = parser.parse_args(argv)
+
+    results = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'budget': args.budget,
+        },
+        'results': {},
+    }
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in args.sizes:
+            results['results'][str(size)] = run_size(size, args.budget, workdir)
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f'结果已写入 {args.output}')
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f'基线已保存到 {args.baseline}')
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f'未找到基线 {args.baseline}，跳过比较')
+        return 0
+
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f'性能回归（容差 {args.tolerance:.0%}）：', file=sys.stderr)
+        for line in regressions:
+            print(f'  {line}', file=sys.stderr)
+        return 1
+    print('未发现性能回归')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
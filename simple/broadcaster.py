@@ -0,0 +1,63 @@
+"""事件广播 - 将图书馆变更推送给订阅的客户端（Server-Sent Events）"""
+import json
+import queue
+import threading
+
+
+class Subscription:
+    """单个客户端的订阅，事件放在有界队列中"""
+
+    def __init__(self, maxsize: int) -> None:
+        self._queue = queue.Queue(maxsize)
+        # 队列溢出后置为 True，客户端需要整页刷新重新同步
+        self.lagged = False
+
+    def get(self, timeout: float):
+        """取下一条消息，超时返回 None"""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class Broadcaster:
+    def __init__(self, queue_size: int = 100) -> None:
+        self._queue_size = queue_size
+        self._subscriptions = set()
+        self._lock = threading.Lock()
+        self._next_id = 0
+
+    def subscribe(self) -> Subscription:
+        subscription = Subscription(self._queue_size)
+        with self._lock:
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def publish(self, event: str, data: dict) -> None:
+        """向所有客户端扇出一条事件；跟不上的客户端会被断开，而不是拖慢发布方"""
+        with self._lock:
+            self._next_id += 1
+            message = format_sse(event, data, self._next_id)
+            for subscription in list(self._subscriptions):
+                try:
+                    subscription._queue.put_nowait(message)
+                except queue.Full:
+                    subscription.lagged = True
+                    self._subscriptions.discard(subscription)
+
+    def client_count(self) -> int:
+        with self._lock:
+            return len(self._subscriptions)
+
+
+def format_sse(event: str, data: dict, event_id: int = None) -> str:
+    lines = []
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append(f'event: {event}')
+    lines.append(f'data: {json.dumps(data, ensure_ascii=False)}')
+    return '\n'.join(lines) + '\n\n'
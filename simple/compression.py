@@ -0,0 +1,73 @@
+"""响应压缩 - 对足够大的文本类响应做 gzip 压缩"""
+import gzip
+import zlib
+
+from flask import request
+
+# 默认允许压缩的内容类型；图片、已压缩格式和 SSE 推送不在其中
+COMPRESSIBLE_TYPES = frozenset({
+    'text/html',
+    'text/css',
+    'text/plain',
+    'text/javascript',
+    'application/javascript',
+    'application/json',
+    'image/svg+xml',
+})
+
+# 流式响应每累计这么多原始字节就刷出一次压缩数据，保证首字节尽早发出
+STREAM_FLUSH_BYTES = 8192
+
+
+def init_compression(app, min_size: int = 500, mimetypes=COMPRESSIBLE_TYPES, level: int = 6) -> None:
+    """为 app 注册 gzip 压缩；min_size 以下的完整响应不压缩，流式响应总是压缩"""
+
+    @app.after_request
+    def compress_response(response):
+        if (
+            response.status_code != 200
+            or response.mimetype not in mimetypes
+            or 'Content-Encoding' in response.headers
+            or 'gzip' not in request.headers.get('Accept-Encoding', '').lower()
+        ):
+            return response
+
+        if response.is_streamed and not response.direct_passthrough:
+            # 模板流式输出：边生成边压缩
+            response.response = _gzip_stream(response.response, response.mimetype_params.get('charset', 'utf-8'), level)
+            response.headers.pop('Content-Length', None)
+        else:
+            # send_file 返回的静态文件默认直通，这里读出内容后按普通响应处理
+            response.direct_passthrough = False
+            data = response.get_data()
+            if len(data) < min_size:
+                return response
+            response.set_data(gzip.compress(data, compresslevel=level))
+
+        response.headers['Content-Encoding'] = 'gzip'
+        response.vary.add('Accept-Encoding')
+        etag, weak = response.get_etag()
+        if etag:
+            # 压缩后的内容与原始内容不同，不能共用同一个强 ETag。send_file 按原始 ETag 做过
+            # 条件判断，客户端带着压缩版的 ETag 来验证时不会命中，这里按新的 ETag 再判断一次
+            response.set_etag(etag + '-gzip', weak)
+            response.make_conditional(request)
+        return response
+
+
+def _gzip_stream(chunks, charset: str, level: int):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    pending = 0
+    first = True
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode(charset)
+        data = compressor.compress(chunk)
+        pending += len(chunk)
+        if first or pending >= STREAM_FLUSH_BYTES:
+            data += compressor.flush(zlib.Z_SYNC_FLUSH)
+            pending = 0
+            first = False
+        if data:
+            yield data
+    yield compressor.flush()
@@ -1,15 +1,18 @@
 from datetime import datetime, timedelta
 from typing import Optional
+import hashlib
+import os
 
 from flask import (
     Flask,
     flash,
     get_flashed_messages,
     redirect,
-    render_template_string,
     request,
+    stream_template,
     url_for,
 )
+from jinja2 import DictLoader, FileSystemBytecodeCache
 
 class Publication:
     """出版物基类 - 演示继承和多态"""
@@ -335,6 +338,22 @@ class Reader:
 app = Flask(__name__)
 app.secret_key = "dev-secret"
 
+# 内联模板按源码哈希命名后交给 Jinja 加载：编译结果留在 Jinja 的模板缓存里，
+# 字节码写到磁盘，重启后也不必重新解析
+INLINE_TEMPLATES = {}
+app.jinja_loader = DictLoader(INLINE_TEMPLATES)
+TEMPLATE_CACHE_DIR = os.path.join(app.root_path, ".jinja_cache")
+os.makedirs(TEMPLATE_CACHE_DIR, exist_ok=True)
+app.jinja_env.bytecode_cache = FileSystemBytecodeCache(TEMPLATE_CACHE_DIR)
+
+
+def inline_template(name: str, source: str) -> str:
+    """注册内联模板，返回带源码哈希的模板名；源码改动后自然得到新的缓存项"""
+    digest = hashlib.sha256(source.encode("utf-8")).hexdigest()[:16]
+    template_name = f"{name}-{digest}.html"
+    INLINE_TEMPLATES[template_name] = source
+    return template_name
+
 
 # 初始化图书馆数据
 library = Library("简易图书馆")
@@ -487,6 +506,7 @@ INDEX_TEMPLATE = """
 </body>
 </html>
 """
+INDEX_TEMPLATE_NAME = inline_template("index", INDEX_TEMPLATE)
 
 
 def _flash_result(result: str):
@@ -497,8 +517,10 @@ def _flash_result(result: str):
 
 @app.route("/", methods=["GET"])
 def index():
-    return render_template_string(
-        INDEX_TEMPLATE,
+    # 流式输出前先取出提示消息，session 的修改要在响应头发出前完成
+    get_flashed_messages()
+    return stream_template(
+        INDEX_TEMPLATE_NAME,
         library=library,
         readers=library.readers,
         get_flashed_messages=get_flashed_messages,
@@ -0,0 +1,213 @@
+"""逾期罚款批量计算
+
+按每天 0.5 元（与前端 FineService 一致，这里以分为单位避免浮点误差）为所有在借记录
+计算逾期天数和罚款。一次计算只遍历一遍应还日期，结果写入独立的 SQLite 文件时
+只写入与上次相比有变化的记录，并在一个事务内批量提交。计算在后台线程中定时运行，
+不占用请求线程；多个进程共用同一个文件时，间隔内已有进程计算过就跳过。
+
+罚款记录的状态：accruing 表示仍在借、每天累加；final 表示已归还，金额不再变化。
+"""
+import logging
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+# 每天的罚款（分）
+DAILY_FINE_CENTS = 50
+
+# 默认计算间隔（秒）
+DEFAULT_INTERVAL = 3600
+
+SECONDS_PER_DAY = 24 * 60 * 60
+
+logger = logging.getLogger('library.fines')
+
+
+def loan_key(reader_id: str, title: str, issue, due_date: datetime) -> str:
+    """一次借阅的唯一标识：同一读者同一出版物的不同次借阅应还日期不同"""
+    return '\x1f'.join((reader_id, title, issue or '', due_date.isoformat()))
+
+
+def overdue_days(due_date: datetime, now: datetime) -> int:
+    """逾期满一天才计一天，与前端 borrowService 的计算方式一致"""
+    return max(0, int((now - due_date).total_seconds() // SECONDS_PER_DAY))
+
+
+class FineEngine:
+    def __init__(self, path: str, daily_cents: int = DAILY_FINE_CENTS) -> None:
+        self._path = path
+        self.daily_cents = daily_cents
+        self._local = threading.local()
+        # 各记录上次写入的逾期天数，只有变化时才写库
+        self._last_days = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.last_run = None
+
+        conn = self._connection()
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS fines ('
+            ' loan_key TEXT PRIMARY KEY,'
+            ' reader_id TEXT NOT NULL,'
+            ' title TEXT NOT NULL,'
+            ' issue TEXT,'
+            ' due_date TEXT NOT NULL,'
+            ' overdue_days INTEGER NOT NULL,'
+            ' amount_cents INTEGER NOT NULL,'
+            ' status TEXT NOT NULL,'
+            ' assessed_at TEXT NOT NULL)'
+        )
+        conn.execute('CREATE INDEX IF NOT EXISTS fines_reader ON fines (reader_id, status)')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS fine_runs ('
+            ' id INTEGER PRIMARY KEY AUTOINCREMENT,'
+            ' started_at TEXT NOT NULL,'
+            ' seconds REAL NOT NULL,'
+            ' loans INTEGER NOT NULL,'
+            ' overdue INTEGER NOT NULL,'
+            ' written INTEGER NOT NULL)'
+        )
+        self._last_days = dict(conn.execute(
+            "SELECT loan_key, overdue_days FROM fines WHERE status = 'accruing'").fetchall())
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self._path, timeout=30, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    def assess(self, loans: list, now: datetime = None, min_interval: float = 0) -> dict:
+        """计算 loans [(读者 ID, 标题, 期号, 应还日期)] 的罚款并增量写库
+
+        min_interval 大于 0 时，若该间隔内已有进程计算过则跳过并返回 None。
+        """
+        now = now or datetime.now()
+        started = time.perf_counter()
+        now_ts = now.timestamp()
+        # 一遍遍历求出所有逾期天数
+        days = [max(0, int((now_ts - due.timestamp()) // SECONDS_PER_DAY)) for _, _, _, due in loans]
+
+        rows = []
+        current = {}
+        with self._lock:
+            for (reader_id, title, issue, due), overdue in zip(loans, days):
+                if overdue <= 0:
+                    continue
+                key = loan_key(reader_id, title, issue, due)
+                current[key] = overdue
+                if self._last_days.get(key) != overdue:
+                    rows.append((key, reader_id, title, issue, due.isoformat(), overdue,
+                                 overdue * self.daily_cents, 'accruing', now.isoformat()))
+            # 上次还在计费、这次不在在借列表中的记录（已在其他进程归还等）不再累加
+            closed = [(key,) for key in self._last_days if key not in current]
+
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            if min_interval > 0:
+                last = conn.execute('SELECT MAX(started_at) FROM fine_runs').fetchone()[0]
+                if last and (now - datetime.fromisoformat(last)).total_seconds() < min_interval:
+                    conn.execute('ROLLBACK')
+                    return None
+            conn.executemany(
+                'INSERT INTO fines (loan_key, reader_id, title, issue, due_date, overdue_days, amount_cents,'
+                ' status, assessed_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)'
+                ' ON CONFLICT (loan_key) DO UPDATE SET overdue_days = excluded.overdue_days,'
+                ' amount_cents = excluded.amount_cents, assessed_at = excluded.assessed_at'
+                " WHERE fines.status = 'accruing'",
+                rows
+            )
+            conn.executemany("UPDATE fines SET status = 'final' WHERE loan_key = ?", closed)
+            result = {
+                'started_at': now.isoformat(),
+                'seconds': time.perf_counter() - started,
+                'loans': len(loans),
+                'overdue': len(current),
+                'written': len(rows) + len(closed),
+            }
+            conn.execute(
+                'INSERT INTO fine_runs (started_at, seconds, loans, overdue, written) VALUES (?, ?, ?, ?, ?)',
+                (result['started_at'], result['seconds'], result['loans'], result['overdue'], result['written'])
+            )
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+        with self._lock:
+            self._last_days = current
+        self.last_run = result
+        return result
+
+    def close_loan(self, reader_id: str, title: str, issue, due_date: datetime, returned_at: datetime) -> None:
+        """归还时确定最终罚款；按时归还且没有计费记录时不写库"""
+        key = loan_key(reader_id, title, issue, due_date)
+        overdue = overdue_days(due_date, returned_at)
+        with self._lock:
+            tracked = self._last_days.pop(key, None) is not None
+        if overdue <= 0 and not tracked:
+            return
+        self._connection().execute(
+            'INSERT INTO fines (loan_key, reader_id, title, issue, due_date, overdue_days, amount_cents,'
+            ' status, assessed_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)'
+            ' ON CONFLICT (loan_key) DO UPDATE SET overdue_days = excluded.overdue_days,'
+            ' amount_cents = excluded.amount_cents, status = excluded.status, assessed_at = excluded.assessed_at',
+            (key, reader_id, title, issue, due_date.isoformat(), overdue, overdue * self.daily_cents,
+             'final', returned_at.isoformat())
+        )
+
+    def reader_total(self, reader_id: str) -> int:
+        """读者的罚款总额（分）"""
+        return self._connection().execute(
+            'SELECT COALESCE(SUM(amount_cents), 0) FROM fines WHERE reader_id = ?', (reader_id,)).fetchone()[0]
+
+    def summary(self, top: int = 10) -> dict:
+        conn = self._connection()
+        totals = {status: {'count': count, 'amount_cents': cents} for status, count, cents in conn.execute(
+            'SELECT status, COUNT(*), SUM(amount_cents) FROM fines GROUP BY status')}
+        readers = [{'reader_id': reader_id, 'amount_cents': cents} for reader_id, cents in conn.execute(
+            'SELECT reader_id, SUM(amount_cents) AS total FROM fines GROUP BY reader_id'
+            ' ORDER BY total DESC LIMIT ?', (top,))]
+        last = conn.execute(
+            'SELECT started_at, seconds, loans, overdue, written FROM fine_runs ORDER BY id DESC LIMIT 1').fetchone()
+        return {
+            'daily_cents': self.daily_cents,
+            'totals': totals,
+            'top_readers': readers,
+            'last_run': dict(zip(('started_at', 'seconds', 'loans', 'overdue', 'written'), last)) if last else None,
+        }
+
+    def start(self, snapshot, interval: float = DEFAULT_INTERVAL) -> None:
+        """在后台线程中每隔 interval 秒对 snapshot() 返回的在借记录计算一次，启动后立即计算一次"""
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, args=(snapshot, interval), name='fine-engine',
+                                            daemon=True)
+        self._thread.start()
+
+    def _run(self, snapshot, interval: float) -> None:
+        triggered = False
+        while not self._stop.is_set():
+            try:
+                # 手动触发的计算不受间隔限制
+                self.assess(snapshot(), min_interval=0 if triggered else interval * 0.9)
+            except Exception:
+                logger.exception('罚款计算失败')
+            triggered = self._wake.wait(interval)
+            self._wake.clear()
+
+    def trigger(self) -> None:
+        """唤醒后台线程立即计算一次"""
+        self._wake.set()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
@@ -0,0 +1,55 @@
+"""渲染片段缓存 - 有界 LRU，按集合精确失效"""
+import threading
+from collections import OrderedDict
+
+
+class FragmentCache:
+    """缓存已渲染的 HTML 片段
+
+    缓存键的第一个元素是集合名（如 'publications'），第二个元素是集合版本号，
+    其余元素为片段名及分页/筛选参数。集合变更时调用 invalidate() 丢弃该集合的全部片段。
+    """
+
+    def __init__(self, maxsize: int = 64) -> None:
+        self._maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_render(self, key: tuple, render) -> str:
+        with self._lock:
+            html = self._entries.get(key)
+            if html is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return html
+            self.misses += 1
+
+        # 渲染放在锁外，避免慢渲染阻塞其他请求
+        html = render()
+
+        with self._lock:
+            self._entries[key] = html
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._maxsize:
+                self._entries.popitem(last=False)
+        return html
+
+    def invalidate(self, *collections: str) -> None:
+        with self._lock:
+            for key in [k for k in self._entries if k[0] in collections]:
+                del self._entries[key]
+
+    def items(self) -> list:
+        with self._lock:
+            return list(self._entries.items())
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._entries),
+                'maxsize': self._maxsize,
+            }
@@ -0,0 +1,236 @@
+"""标题模糊匹配
+
+三元组（trigram）倒排索引：每个条目的文本首尾各补两个边界符后切成三字符片段，
+片段 -> 文本长度 -> 含有该片段的条目编号集合。按长度分桶后，长度过滤变成只取
+几个桶，集合运算都在 C 层完成。纠错查询：
+
+- 候选过滤：编辑距离为 k 时，一次编辑最多破坏 3 个片段，候选至少要与查询共享
+  need = G - 3k 个片段（G 为查询的片段数），必然出现在最短的 G - need + 1 个
+  倒排表之一中；
+- 逐步展开：从最短的倒排表开始每次取一个，新出现的条目依次与其余倒排表求交集，
+  按缺少的片段数分组，缺得太多的组直接丢弃。没出现过的条目缺少已取的全部片段，
+  取了 m 个倒排表后它们的距离下限是 ceil(m / 3)；
+- 验证：共享片段越多距离下限 ceil((G - 共享数) / 3) 越小，按共享数从多到少用带状
+  （只算对角线两侧 k 格）的有界编辑距离验证。已有足够多不劣于剩余候选和未出现
+  条目下限的结果时停止，书名高度相似（同一书名的各卷）时通常取四五个倒排表就够了。
+
+子串搜索按长度从短到长逐桶求交集，凑够条数即停止；一两个字的查询没有完整片段，
+取以它开头的所有片段的并集（每个字符都是某个片段的开头）。
+
+条目是 (键, 文本) 对，同一个键可以有多段文本（如标题的不同写法），结果按键去重。
+"""
+import heapq
+import threading
+from typing import Hashable, Optional
+
+# 边界符，保证首尾字符也出现在三个片段中
+PAD = '\x00'
+GRAM = 3
+# 默认最多返回的建议数；编辑距离上限
+DEFAULT_LIMIT = 5
+MAX_DISTANCE = 3
+
+EMPTY = frozenset()
+
+
+def normalize(text: str) -> str:
+    """忽略大小写和空白"""
+    return ''.join(text.split()).casefold()
+
+
+def grams(text: str) -> set:
+    padded = PAD * (GRAM - 1) + text + PAD * (GRAM - 1)
+    return {padded[i:i + GRAM] for i in range(len(padded) - GRAM + 1)}
+
+
+def default_distance(length: int) -> int:
+    """按查询长度允许的编辑距离：每八个字允许错一个字
+
+    距离越大候选过滤越弱，标题通常只错一两个字，不必放得更宽。
+    """
+    return min(MAX_DISTANCE, 1 + (length - 1) // 8)
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Levenshtein 距离，超过 limit 时返回 limit + 1；只计算对角线两侧 limit 格"""
+    over = limit + 1
+    if abs(len(a) - len(b)) > limit:
+        return over
+    previous = [j if j <= limit else over for j in range(len(b) + 1)]
+    for i, ca in enumerate(a, 1):
+        lo, hi = max(1, i - limit), min(len(b), i + limit)
+        current = [over] * (len(b) + 1)
+        if i <= limit:
+            current[0] = i
+        for j in range(lo, hi + 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != b[j - 1]))
+        if min(current[lo - 1:hi + 1]) > limit:
+            return over
+        previous = current
+    return min(previous[-1], over)
+
+
+class TrigramIndex:
+    def __init__(self) -> None:
+        # 条目编号 -> (键, 规范化文本)，删除后编号留给后来的条目复用
+        self._entries = []
+        self._free = []
+        self._ids = {}
+        # 片段 -> {文本长度: 条目编号集合}
+        self._postings = {}
+        # 一两个字 -> 以它开头的片段，供短查询的子串搜索使用
+        self._heads = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def add(self, key: Hashable, text: Optional[str] = None) -> None:
+        """加入条目，text 默认为 key 本身"""
+        entry = (key, normalize(key if text is None else text))
+        length = len(entry[1])
+        with self._lock:
+            if entry in self._ids or not length:
+                return
+            if self._free:
+                entry_id = self._free.pop()
+                self._entries[entry_id] = entry
+            else:
+                entry_id = len(self._entries)
+                self._entries.append(entry)
+            self._ids[entry] = entry_id
+            for gram in grams(entry[1]):
+                buckets = self._postings.get(gram)
+                if buckets is None:
+                    buckets = self._postings[gram] = {}
+                    for head in (gram[:1], gram[:2]):
+                        self._heads.setdefault(head, set()).add(gram)
+                buckets.setdefault(length, set()).add(entry_id)
+
+    def discard(self, key: Hashable, text: Optional[str] = None) -> None:
+        entry = (key, normalize(key if text is None else text))
+        length = len(entry[1])
+        with self._lock:
+            entry_id = self._ids.pop(entry, None)
+            if entry_id is None:
+                return
+            for gram in grams(entry[1]):
+                buckets = self._postings[gram]
+                bucket = buckets[length]
+                bucket.discard(entry_id)
+                if bucket:
+                    continue
+                del buckets[length]
+                if buckets:
+                    continue
+                del self._postings[gram]
+                for head in (gram[:1], gram[:2]):
+                    heads = self._heads[head]
+                    heads.discard(gram)
+                    if not heads:
+                        del self._heads[head]
+            self._entries[entry_id] = None
+            self._free.append(entry_id)
+
+    def suggest(self, query: str, limit: int = DEFAULT_LIMIT, max_distance: Optional[int] = None) -> list:
+        """与查询编辑距离最小的 [(键, 距离)]，距离相同时共享片段多、长度接近的在前"""
+        text = normalize(query)
+        if not text:
+            return []
+        k = default_distance(len(text)) if max_distance is None else max_distance
+        query_grams = grams(text)
+        total = len(query_grams)
+        # 查询很短或片段重复较多时下限可能不为正，至少要共享一个片段
+        need = max(1, total - GRAM * k)
+        lengths = range(max(1, len(text) - k), len(text) + k + 1)
+        best = {}
+        # 各编辑距离上已找到的键数
+        found = [0] * (k + 1)
+
+        def enough(bound: int) -> bool:
+            """剩下的条目距离都不小于 bound 时，是否已有足够多不劣于它们的结果"""
+            return bound > k or sum(found[:bound + 1]) >= limit
+
+        with self._lock:
+            # 各片段在长度相差不超过 k 的桶里的倒排表，按总条目数从少到多
+            postings = sorted(([self._postings.get(gram, {}).get(length, EMPTY) for length in lengths]
+                               for gram in query_grams), key=lambda buckets: sum(map(len, buckets)))
+            seen = set()
+            # (-共享片段数, 条目编号)，共享多的先验证
+            heap = []
+            for m in range(total - need + 1):
+                for i, bucket in enumerate(postings[m]):
+                    new = bucket - seen
+                    if not new:
+                        continue
+                    seen |= new
+                    # 新条目不在前面的倒排表中，只需看后面的倒排表。misses[j] 为恰好缺少
+                    # j 个的条目，缺得太多、凑不够 need 个片段的条目直接丢弃
+                    rest = postings[m + 1:]
+                    misses = [new] + [EMPTY] * (len(rest) + 1 - need)
+                    for later in rest:
+                        posting = later[i]
+                        for j in range(len(misses) - 1, 0, -1):
+                            misses[j] = (misses[j] & posting) | (misses[j - 1] - posting)
+                        misses[0] = misses[0] & posting
+                    for j, entries in enumerate(misses):
+                        for entry_id in entries:
+                            heapq.heappush(heap, (j - len(rest) - 1, entry_id))
+                # 还没出现的条目不含前 m + 1 个片段，距离下限为 ceil((m + 1) / 3)；
+                # 取完前 G - need + 1 个倒排表后，没出现的条目不可能满足要求
+                unseen = -(-(m + 1) // GRAM) if m < total - need else k + 1
+                while heap:
+                    top = -(-(total + heap[0][0]) // GRAM)
+                    if top > unseen or enough(top):
+                        break
+                    negative_shared, entry_id = heapq.heappop(heap)
+                    key, candidate = self._entries[entry_id]
+                    distance = edit_distance(text, candidate, k)
+                    if distance > k:
+                        continue
+                    rank = (distance, negative_shared, abs(len(candidate) - len(text)))
+                    previous = best.get(key)
+                    if previous is not None:
+                        if previous <= rank:
+                            continue
+                        found[previous[0]] -= 1
+                    best[key] = rank
+                    found[distance] += 1
+                top = -(-(total + heap[0][0]) // GRAM) if heap else k + 1
+                if enough(min(top, unseen)):
+                    break
+        ranked = sorted(best.items(), key=lambda item: (item[1], str(item[0])))
+        return [(key, rank[0]) for key, rank in ranked[:limit]]
+
+    def search(self, query: str, limit: Optional[int] = None, prefix: bool = False) -> list:
+        """文本中含有（prefix 为 True 时以其开头）查询的键，较短的文本在前
+
+        按长度从短到长逐桶取候选：查询不少于三个字或只匹配开头时取各片段倒排表的交集，
+        更短的子串查询取以它开头的片段的并集。候选最后逐个核对。
+        """
+        text = normalize(query)
+        if not text:
+            return []
+        match = str.startswith if prefix else str.__contains__
+        keys = {}
+        with self._lock:
+            if prefix or len(text) >= GRAM:
+                padded = PAD * (GRAM - 1) + text if prefix else text
+                needed = {padded[i:i + GRAM] for i in range(len(padded) - GRAM + 1)}
+                # 每个片段都必须出现
+                terms = [[self._postings.get(gram, {})] for gram in needed]
+            else:
+                # 以查询开头的任一片段出现即可
+                terms = [[self._postings[gram] for gram in self._heads.get(text, ())]]
+            smallest = min(terms, key=lambda term: sum(sum(map(len, b.values())) for b in term))
+            lengths = sorted({length for b in smallest for length in b if length >= len(text)})
+            for length in lengths:
+                sets = sorted((set().union(*(b.get(length, EMPTY) for b in term)) for term in terms), key=len)
+                for entry_id in sorted(sets[0].intersection(*sets[1:])):
+                    key, candidate = self._entries[entry_id]
+                    if key not in keys and match(candidate, text):
+                        keys[key] = None
+                if limit is not None and len(keys) >= limit:
+                    break
+        result = list(keys)
+        return result[:limit] if limit is not None else result
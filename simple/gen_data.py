@@ -0,0 +1,197 @@
+"""合成数据集生成器
+
+按给定规模生成图书、期刊（按系列生成多期）、读者和在借记录，写成与
+library_data.json 相同的格式，供基准测试和压测使用。书名以中文为主，
+借阅热度服从 Zipf 分布；相同的参数和种子总是得到相同的数据
+（应还日期相对于 --base-date，需要逐字节一致时请固定该参数）。
+
+    python gen_data.py --books 100000 --readers 10000 --loans 20000 -o big.json
+"""
+import argparse
+import bisect
+import itertools
+import json
+import random
+import sys
+from datetime import date, datetime, timedelta
+
+# 书名素材
+CJK_PREFIXES = ['深入理解', '精通', '实战', '图解', '从零开始学', '高性能', '现代', '趣学', '详解', '漫谈']
+CJK_SUBJECTS = ['操作系统', '计算机网络', '数据库系统', '机器学习', '分布式系统', '编译原理', '算法设计',
+                '软件工程', '设计模式', '数据结构', '计算机组成', '人工智能', '信息检索', '图书馆学',
+                '中国近代史', '红楼梦研究', '经济学原理', '线性代数', '概率论', '微积分']
+CJK_SUFFIXES = ['', '', '', '（第2版）', '（第3版）', '原理与实践', '导论', '精要', '案例教程', '入门']
+EN_PREFIXES = ['Practical', 'Modern', 'Advanced', 'Effective', 'Essential', 'Programming', 'Learning']
+EN_SUBJECTS = ['Python', 'Rust', 'Databases', 'Networks', 'Compilers', 'Algorithms', 'Linux', 'Statistics']
+CATEGORIES = ['编程', '软件工程', '计算机', '数学', '历史', '文学', '经济', '哲学', '艺术', '图书馆学']
+SURNAMES = '王李张刘陈杨黄赵吴周徐孙马朱胡郭何高林罗'
+GIVEN_NAMES = '伟芳娜敏静丽强磊军洋勇艳杰涛明超秀霞平刚桂英华'
+MAGAZINE_NAMES = ['计算机科学', '软件学报', '中国图书馆学报', '计算机学报', '读者', '科学美国人',
+                  '电子学报', '自然辩证法研究', '数学学报', '经济研究']
+PUBLISHERS = ['科学出版社', '人民邮电出版社', '机械工业出版社', '清华大学出版社', '电子工业出版社',
+              '高等教育出版社', '商务印书馆', '中华书局']
+
+# 借阅期限，与 Book / Magazine 的 get_max_loan_days 一致
+BOOK_LOAN_DAYS = 14
+MAGAZINE_LOAN_DAYS = 7
+
+# 在借记录中已逾期的比例
+OVERDUE_RATIO = 0.1
+
+
+def zipf_cumulative_weights(n: int, s: float) -> list:
+    """排名 1..n 的 Zipf 累计权重，配合 bisect 抽样"""
+    return list(itertools.accumulate(1.0 / (rank ** s) for rank in range(1, n + 1)))
+
+
+def isbn13(rng: random.Random) -> str:
+    digits = [9, 7, 8] + [rng.randrange(10) for _ in range(9)]
+    check = (10 - sum(d * (3 if i % 2 else 1) for i, d in enumerate(digits)) % 10) % 10
+    return ''.join(map(str, digits + [check]))
+
+
+def person_name(rng: random.Random) -> str:
+    return rng.choice(SURNAMES) + ''.join(rng.choice(GIVEN_NAMES) for _ in range(rng.randint(1, 2)))
+
+
+def unique_titles(rng: random.Random, count: int, cjk_ratio: float):
+    """素材组合有限，重复的组合依次加上卷号"""
+    volumes = {}
+    for _ in range(count):
+        if rng.random() < cjk_ratio:
+            base = rng.choice(CJK_PREFIXES) + rng.choice(CJK_SUBJECTS) + rng.choice(CJK_SUFFIXES)
+        else:
+            base = f'{rng.choice(EN_PREFIXES)} {rng.choice(EN_SUBJECTS)}'
+        volume = volumes.get(base, 0) + 1
+        volumes[base] = volume
+        yield base if volume == 1 else f'{base}（卷{volume}）'
+
+
+def magazine_series_names(count: int):
+    for i in range(count):
+        name = MAGAZINE_NAMES[i % len(MAGAZINE_NAMES)]
+        yield name if i < len(MAGAZINE_NAMES) else f'{name}·{i // len(MAGAZINE_NAMES) + 1}辑'
+
+
+def generate(books: int, series: int, issues: int, readers: int, loans: int,
+             seed: int = 0, zipf_s: float = 1.1, cjk_ratio: float = 0.8,
+             base_date: date = None) -> dict:
+    rng = random.Random(seed)
+    base_date = base_date or date.today()
+
+    publications = []
+    for title in unique_titles(rng, books, cjk_ratio):
+        publications.append({
+            'type': 'book',
+            'title': title,
+            'author': person_name(rng),
+            'isbn': isbn13(rng),
+            'category': rng.choice(CATEGORIES)
+        })
+
+    # 每个系列按月连续出版，最后一期为最新期刊
+    for name in magazine_series_names(series):
+        publisher = rng.choice(PUBLISHERS)
+        for i in range(issues):
+            month_index = base_date.year * 12 + base_date.month - 1 - (issues - 1 - i)
+            year, month = divmod(month_index, 12)
+            month += 1
+            publications.append({
+                'type': 'magazine',
+                'title': name,
+                'issue': f'{year}-{month:02d}',
+                'publisher': publisher,
+                'is_latest': i == issues - 1
+            })
+
+    reader_rows = [
+        {
+            'name': person_name(rng),
+            'reader_id': f'{2020000000 + i}',
+            'password': f'pass{2020000000 + i}',
+            'max_borrow_limit': 3
+        }
+        for i in range(readers)
+    ]
+
+    # 热度排名随机打乱后按 Zipf 分布抽取被借出的出版物（每种只有一本）
+    ranking = list(range(len(publications)))
+    rng.shuffle(ranking)
+    cumulative = zipf_cumulative_weights(len(ranking), zipf_s)
+    quota = {r['reader_id']: r['max_borrow_limit'] for r in reader_rows}
+    loans = min(loans, len(publications), sum(quota.values()))
+    available_readers = [r for r in quota if quota[r]]
+    borrowed = set()
+    loan_rows = []
+    for index in _zipf_candidates(rng, ranking, cumulative, loans):
+        if len(loan_rows) >= loans:
+            break
+        if index in borrowed:
+            continue
+        position = rng.randrange(len(available_readers))
+        reader_id = available_readers[position]
+        publication = publications[index]
+        loan_days = BOOK_LOAN_DAYS if publication['type'] == 'book' else MAGAZINE_LOAN_DAYS
+        if rng.random() < OVERDUE_RATIO:
+            due = base_date - timedelta(days=rng.randint(1, 60))
+        else:
+            due = base_date + timedelta(days=rng.randint(0, loan_days))
+        loan = {'title': publication['title']}
+        if publication['type'] == 'magazine':
+            loan['issue'] = publication['issue']
+        loan['reader_id'] = reader_id
+        loan['borrowed_at'] = datetime.combine(due - timedelta(days=loan_days), datetime.min.time()).isoformat()
+        loan['due_date'] = datetime.combine(due, datetime.min.time()).isoformat()
+        loan_rows.append(loan)
+        borrowed.add(index)
+        quota[reader_id] -= 1
+        if quota[reader_id] == 0:
+            available_readers[position] = available_readers[-1]
+            available_readers.pop()
+
+    return {'readers': reader_rows, 'publications': publications, 'loans': loan_rows}
+
+
+def _zipf_candidates(rng: random.Random, ranking: list, cumulative: list, wanted: int):
+    """先按 Zipf 分布抽样；借出比例很高时抽样命中率下降，再按热度顺序补齐"""
+    for _ in range(wanted * 20):
+        yield ranking[bisect.bisect_left(cumulative, rng.random() * cumulative[-1])]
+    yield from ranking
+
+
+def write_json(data: dict, path: str) -> None:
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+# 输出格式，新增的存储格式在这里注册写出函数
+FORMATS = {
+    'json': write_json,
+}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='生成合成图书馆数据集')
+    parser.add_argument('--books', type=int, default=1000)
+    parser.add_argument('--series', type=int, default=20, help='期刊系列数')
+    parser.add_argument('--issues', type=int, default=12, help='每个系列的期数')
+    parser.add_argument('--readers', type=int, default=200)
+    parser.add_argument('--loans', type=int, default=100, help='在借记录数')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--zipf', type=float, default=1.1, help='借阅热度的 Zipf 指数')
+    parser.add_argument('--cjk-ratio', type=float, default=0.8, help='中文书名的比例')
+    parser.add_argument('--base-date', type=date.fromisoformat, default=None, help='计算应还日期的基准日期')
+    parser.add_argument('--format', choices=sorted(FORMATS), default='json')
+    parser.add_argument('-o', '--output', default='generated_data.json')
+    args = parser.parse_args(argv)
+
+    data = generate(args.books, args.series, args.issues, args.readers, args.loans,
+                    seed=args.seed, zipf_s=args.zipf, cjk_ratio=args.cjk_ratio, base_date=args.base_date)
+    FORMATS[args.format](data, args.output)
+    print(f"已生成 {len(data['publications'])} 种出版物、{len(data['readers'])} 位读者、"
+          f"{len(data['loans'])} 条在借记录 -> {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,147 @@
+"""管理员统计
+
+启动时按当前数据统计一遍，此后随图书馆的变更事件增量更新，查询时直接返回计数：
+
+- 出版物：图书、期刊的种数和总册数；
+- 借阅：在借册数、在馆册数、各分类的在借册数；
+- 读者：总数和借满额度的人数；
+- 逾期：在借记录按应还日期放入堆中，查询时把已到期的移出计入逾期，每条记录只处理一次。
+
+事件在变更完成后才通知，统计时可以直接读取出版物和读者的最新状态。
+"""
+import heapq
+import threading
+from datetime import datetime
+
+# 期刊没有分类，统一归入这一类
+MAGAZINE_CATEGORY = '期刊'
+
+
+class LibraryStats:
+    def __init__(self, library, book_type, magazine_type) -> None:
+        self._library = library
+        self._book_type = book_type
+        self._magazine_type = magazine_type
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self.books = 0
+        self.magazines = 0
+        self.copies = 0
+        self.on_loan = 0
+        self.loans_by_category = {}
+        self.readers = 0
+        self.readers_at_quota = 0
+        # 尚未逾期的在借记录，以及已逾期的在借记录；键为 (读者 ID, 标题, 期号, 应还日期)
+        self._pending = set()
+        self._overdue = set()
+        self._due_heap = []
+
+    def rebuild(self) -> None:
+        """按当前数据全量统计一遍"""
+        with self._lock:
+            self._reset()
+            for publication in self._library._publications:
+                self._count_publication(publication, 1, publication.copy_count)
+            for reader in self._library._readers:
+                self.readers += 1
+                if reader.get_remaining_quota() <= 0:
+                    self.readers_at_quota += 1
+                for copy in reader._borrowed_items:
+                    self._start_loan(reader.reader_id, copy.title, getattr(copy.publication, 'issue', None),
+                                     self._category(copy.publication), copy.due_date)
+
+    def _category(self, publication) -> str:
+        return publication.category if isinstance(publication, self._book_type) else MAGAZINE_CATEGORY
+
+    def _count_publication(self, publication, sign: int, copies: int) -> None:
+        if isinstance(publication, self._magazine_type):
+            self.magazines += sign
+        else:
+            self.books += sign
+        self.copies += sign * copies
+
+    def _start_loan(self, reader_id: str, title: str, issue, category: str, due_date: datetime) -> None:
+        key = (reader_id, title, issue, due_date)
+        self.on_loan += 1
+        self.loans_by_category[category] = self.loans_by_category.get(category, 0) + 1
+        self._pending.add(key)
+        heapq.heappush(self._due_heap, (due_date, key))
+
+    def _end_loan(self, reader_id: str, title: str, issue, category: str, due_date: datetime) -> None:
+        key = (reader_id, title, issue, due_date)
+        self.on_loan -= 1
+        remaining = self.loans_by_category[category] - 1
+        if remaining:
+            self.loans_by_category[category] = remaining
+        else:
+            del self.loans_by_category[category]
+        # 堆中的条目留到出堆时丢弃
+        if key in self._overdue:
+            self._overdue.discard(key)
+        else:
+            self._pending.discard(key)
+
+    def on_event(self, event: str, payload: dict) -> None:
+        """图书馆变更监听器"""
+        library = self._library
+        with self._lock:
+            if event == 'add':
+                publication = library.get_publication(payload['title'], payload.get('issue'))
+                if publication is not None:
+                    self._count_publication(publication, 1, publication.copy_count)
+            elif event == 'add_copies':
+                self.copies += payload['count']
+            elif event == 'remove':
+                # 出版物已移除，类型和册数取自事件
+                self.copies -= payload['copies']
+                if 'issue' in payload:
+                    self.magazines -= 1
+                else:
+                    self.books -= 1
+            elif event == 'reader':
+                reader = library.get_reader(payload['reader_id'])
+                self.readers += 1
+                if reader is not None and reader.get_remaining_quota() <= 0:
+                    self.readers_at_quota += 1
+            elif event in ('borrow', 'return'):
+                publication = library.get_publication(payload['title'], payload.get('issue'))
+                reader = library.get_reader(payload['reader_id'])
+                if publication is None or reader is None:
+                    return
+                loan = (payload['reader_id'], payload['title'], payload.get('issue'), self._category(publication),
+                        datetime.fromisoformat(payload['due_date']))
+                remaining = reader.get_remaining_quota()
+                if event == 'borrow':
+                    self._start_loan(*loan)
+                    if remaining == 0:
+                        self.readers_at_quota += 1
+                else:
+                    self._end_loan(*loan)
+                    if remaining == 1:
+                        self.readers_at_quota -= 1
+
+    def overdue(self, now: datetime = None) -> int:
+        """逾期的在借数量；均摊 O(1)"""
+        now = now or datetime.now()
+        with self._lock:
+            heap = self._due_heap
+            while heap and heap[0][0] < now:
+                _, key = heapq.heappop(heap)
+                if key in self._pending:
+                    self._pending.discard(key)
+                    self._overdue.add(key)
+            return len(self._overdue)
+
+    def summary(self, now: datetime = None) -> dict:
+        overdue = self.overdue(now)
+        with self._lock:
+            return {
+                'publications': {'books': self.books, 'magazines': self.magazines,
+                                 'total': self.books + self.magazines},
+                'copies': {'total': self.copies, 'on_loan': self.on_loan, 'on_shelf': self.copies - self.on_loan},
+                'loans_by_category': dict(self.loans_by_category),
+                'readers': {'total': self.readers, 'at_quota': self.readers_at_quota},
+                'overdue': overdue,
+            }
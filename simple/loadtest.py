@@ -0,0 +1,297 @@
+"""HTTP 压测工具
+
+在临时目录中用合成数据集启动一个本地服务（也可以用 --url 指向已启动的服务），
+然后用多个并发的模拟用户按真实比例访问登录、读者中心、借阅、归还和管理员添加
+图书等路由，最后报告每秒请求数、延迟分位数以及错误率和借阅冲突率。
+
+    python loadtest.py --users 50 --duration 30
+    python loadtest.py --server-cmd "gunicorn -w 4 -k gthread -b {host}:{port} app:app"
+"""
+import argparse
+import bisect
+import http.cookiejar
+import json
+import os
+import random
+import shlex
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+from collections import defaultdict
+
+from gen_data import generate, write_json, zipf_cumulative_weights
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 默认服务命令：单进程多线程的开发服务器
+DEFAULT_SERVER_CMD = (
+    f'{shlex.quote(sys.executable)} -c "import sys; sys.path.insert(0, {APP_DIR!r}); import app; '
+    'app.app.run(host=\'{host}\', port={port}, threaded=True)"'
+)
+
+# 读者会话中各操作的权重
+READER_MIX = {'dashboard': 5, 'borrow': 2, 'return': 2}
+# 每多少个模拟用户中有一个是管理员
+ADMIN_EVERY = 20
+
+# 根据页面提示消息判断借阅结果
+BORROW_CONFLICT_MARKERS = ('书已被', '书已全部借出')
+BORROW_REJECT_MARKERS = ('已达到最大借阅数量', '图书馆没有')
+
+
+class NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+class Stats:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.outcomes = defaultdict(int)
+
+    def record(self, route: str, seconds: float, ok: bool) -> None:
+        with self._lock:
+            self.latencies[route].append(seconds)
+            if not ok:
+                self.errors[route] += 1
+
+    def outcome(self, name: str) -> None:
+        with self._lock:
+            self.outcomes[name] += 1
+
+
+class User:
+    """一个模拟用户，持有自己的 cookie 会话"""
+
+    def __init__(self, base_url: str, stats: Stats) -> None:
+        self.base_url = base_url
+        self.stats = stats
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), NoRedirect)
+
+    def request(self, route: str, data: dict = None) -> tuple:
+        """发送请求（不跟随重定向），返回 (状态码, 响应文本)"""
+        body = urllib.parse.urlencode(data).encode() if data is not None else None
+        started = time.perf_counter()
+        try:
+            with self.opener.open(self.base_url + route, body, timeout=30) as response:
+                status, text = response.status, response.read().decode('utf-8', 'replace')
+        except urllib.error.HTTPError as e:
+            status, text = e.code, ''
+        except OSError:
+            status, text = 0, ''
+        self.stats.record(route, time.perf_counter() - started, 0 < status < 500)
+        return status, text
+
+
+def reader_session(user: User, reader: dict, borrowed: list, pick_title, deadline: float,
+                   think: float, rng: random.Random) -> None:
+    user.request('/login', {'user_type': 'reader', 'user_id': reader['reader_id'],
+                            'password': reader['password']})
+    actions, weights = zip(*READER_MIX.items())
+    while time.time() < deadline:
+        action = rng.choices(actions, weights)[0]
+        if action == 'dashboard':
+            user.request('/reader/dashboard')
+        elif action == 'borrow':
+            title = pick_title()
+            user.request('/reader/borrow', {'title': title})
+            _, page = user.request('/reader/dashboard')
+            if '借阅成功' in page:
+                borrowed.append(title)
+                user.stats.outcome('borrow_ok')
+            elif any(marker in page for marker in BORROW_CONFLICT_MARKERS):
+                user.stats.outcome('borrow_conflict')
+            elif any(marker in page for marker in BORROW_REJECT_MARKERS):
+                user.stats.outcome('borrow_rejected')
+        elif borrowed:
+            title = borrowed.pop(rng.randrange(len(borrowed)))
+            user.request('/reader/return', {'title': title})
+            _, page = user.request('/reader/dashboard')
+            user.stats.outcome('return_ok' if '成功归还' in page else 'return_failed')
+        if think:
+            time.sleep(rng.uniform(0, think * 2))
+
+
+def admin_session(user: User, deadline: float, think: float, rng: random.Random) -> None:
+    user.request('/login', {'user_type': 'admin', 'user_id': 'admin', 'password': 'admin123'})
+    while time.time() < deadline:
+        if rng.random() < 0.3:
+            user.request('/admin/add_book', {
+                'title': f'压测图书-{uuid.UUID(int=rng.getrandbits(128)).hex[:12]}',
+                'author': '压测', 'isbn': '0000000000000', 'category': '压测'})
+            _, page = user.request('/admin/dashboard')
+            user.stats.outcome('add_book_ok' if '添加成功' in page else 'add_book_failed')
+        else:
+            user.request('/admin/dashboard')
+        if think:
+            time.sleep(rng.uniform(0, think * 2))
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_until_ready(url: str, timeout: float = 60) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(url + '/', timeout=2).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'服务 {url} 在 {timeout} 秒内未就绪')
+
+
+def percentile(sorted_values: list, q: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * q))]
+
+
+def report(stats: Stats, elapsed: float) -> dict:
+    routes = {}
+    total = 0
+    for route, values in sorted(stats.latencies.items()):
+        values = sorted(values)
+        total += len(values)
+        routes[route] = {
+            'requests': len(values),
+            'rps': len(values) / elapsed,
+            'error_rate': stats.errors[route] / len(values),
+            'p50_ms': percentile(values, 0.50) * 1000,
+            'p90_ms': percentile(values, 0.90) * 1000,
+            'p99_ms': percentile(values, 0.99) * 1000,
+            'max_ms': values[-1] * 1000,
+        }
+    attempts = sum(stats.outcomes[k] for k in ('borrow_ok', 'borrow_conflict', 'borrow_rejected'))
+    return {
+        'elapsed_seconds': elapsed,
+        'requests': total,
+        'rps': total / elapsed,
+        'error_rate': sum(stats.errors.values()) / total if total else 0.0,
+        'borrow_conflict_rate': stats.outcomes['borrow_conflict'] / attempts if attempts else 0.0,
+        'outcomes': dict(stats.outcomes),
+        'routes': routes,
+    }
+
+
+def print_report(result: dict) -> None:
+    print(f"\n总计 {result['requests']} 个请求，{result['rps']:.1f} req/s，"
+          f"错误率 {result['error_rate']:.2%}，借阅冲突率 {result['borrow_conflict_rate']:.2%}")
+    print(f"{'路由':24s}{'请求数':>8s}{'req/s':>9s}{'错误率':>8s}{'p50ms':>9s}{'p90ms':>9s}{'p99ms':>9s}{'max':>9s}")
+    for route, r in result['routes'].items():
+        print(f"{route:24s}{r['requests']:>10d}{r['rps']:>9.1f}{r['error_rate']:>10.2%}"
+              f"{r['p50_ms']:>9.1f}{r['p90_ms']:>9.1f}{r['p99_ms']:>9.1f}{r['max_ms']:>9.1f}")
+    print('结果统计：', json.dumps(result['outcomes'], ensure_ascii=False))
+
+
+def run(args, workdir: str) -> dict:
+    """在 workdir 中准备数据、按需启动服务并压测，返回统计结果"""
+    data_file = args.data
+    if not data_file:
+        data_file = os.path.join(workdir, 'library_data.json')
+        write_json(generate(args.books, 10, 12, args.readers, args.loans, seed=args.seed), data_file)
+    with open(data_file, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    server = None
+    base_url = args.url
+    if not base_url:
+        if os.path.abspath(data_file) != os.path.join(workdir, 'library_data.json'):
+            with open(os.path.join(workdir, 'library_data.json'), 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+        port = free_port()
+        base_url = f'http://127.0.0.1:{port}'
+        env = dict(os.environ, PYTHONPATH=APP_DIR)
+        if args.shared_db:
+            env['LIBRARY_SHARED_DB'] = os.path.join(workdir, 'library_state.db')
+        server = subprocess.Popen(shlex.split(args.server_cmd.format(host='127.0.0.1', port=port)),
+                                  cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_until_ready(base_url)
+        stats = Stats()
+        titles = [p['title'] for p in data['publications'] if p['type'] == 'book']
+        cumulative = zipf_cumulative_weights(len(titles), 1.1)
+        loans_by_reader = defaultdict(list)
+        for loan in data.get('loans', []):
+            loans_by_reader[loan['reader_id']].append(loan['title'])
+
+        deadline = time.time() + args.duration
+        threads = []
+        for i in range(args.users):
+            rng = random.Random(args.seed * 10007 + i)
+            user = User(base_url, stats)
+            if i % ADMIN_EVERY == ADMIN_EVERY - 1:
+                target, session_args = admin_session, (user, deadline, args.think, rng)
+            else:
+                reader = data['readers'][i % len(data['readers'])]
+                pick_title = (lambda r=rng: titles[bisect.bisect_left(cumulative, r.random() * cumulative[-1])])
+                target = reader_session
+                session_args = (user, reader, list(loans_by_reader[reader['reader_id']]), pick_title,
+                                deadline, args.think, rng)
+            threads.append(threading.Thread(target=target, args=session_args, daemon=True))
+
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        result = report(stats, time.perf_counter() - started)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+    return result
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='图书馆系统 HTTP 压测')
+    parser.add_argument('--users', type=int, default=20, help='并发模拟用户数')
+    parser.add_argument('--duration', type=float, default=20, help='压测时长（秒）')
+    parser.add_argument('--think', type=float, default=0.0, help='平均思考时间（秒）')
+    parser.add_argument('--url', help='压测已启动的服务；需同时用 --data 指定该服务使用的数据文件')
+    parser.add_argument('--data', help='数据集文件，不指定时按下面的规模生成')
+    parser.add_argument('--books', type=int, default=2000)
+    parser.add_argument('--readers', type=int, default=500)
+    parser.add_argument('--loans', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--server-cmd', default=DEFAULT_SERVER_CMD,
+                        help='启动服务的命令，{host} {port} 会被替换，在数据目录下以 APP_DIR 为 PYTHONPATH 运行')
+    parser.add_argument('--shared-db', action='store_true', help='以多进程共享状态模式启动服务')
+    parser.add_argument('--json', help='把结果另存为 JSON 文件')
+    parser.add_argument('--keep', action='store_true', help='保留数据目录（数据文件和服务产生的 SQLite 数据库），默认结束后删除')
+    args = parser.parse_args(argv)
+
+    if args.url and not args.data:
+        parser.error('--url 需要配合 --data 使用')
+
+    workdir = tempfile.mkdtemp(prefix='loadtest-')
+    try:
+        result = run(args, workdir)
+    finally:
+        # 服务已在 run() 中停止，数据库文件不再被占用
+        if args.keep:
+            print(f'数据目录保留在 {workdir}')
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    print_report(result)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
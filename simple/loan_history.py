@@ -0,0 +1,173 @@
+"""借阅历史
+
+每次归还把这次借阅追加到按归还月份分区的历史表（loans_YYYYMM）中，一行只存读者、
+出版物和三个时间戳（微秒整数）。同一事务内增量更新按出版物、读者、分类和日期的借阅次数，
+流通报表直接读这些计数，不扫描历史明细；明细只在查看某个月份时读取。
+
+多进程模式下每个进程都会收到同一条归还事件，按（读者, 标题, 期号, 应还日期）去重，
+只有第一次写入的进程更新计数。
+"""
+import sqlite3
+import threading
+from datetime import date, datetime, timedelta
+
+# 报表默认返回的天数和排行条数
+DEFAULT_DAYS = 30
+DEFAULT_TOP = 10
+
+# 时间戳的起点；应用中的时间都是本地时间，按墙钟时间换算，不经过时区
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+
+
+def partition_name(when: datetime) -> str:
+    return f'loans_{when:%Y%m}'
+
+
+def _timestamp(when: datetime):
+    return (when - EPOCH) // MICROSECOND if when is not None else None
+
+
+def _datetime(microseconds):
+    return (EPOCH + microseconds * MICROSECOND).isoformat() if microseconds is not None else None
+
+
+class LoanHistory:
+    def __init__(self, path: str) -> None:
+        self._path = path
+        self._local = threading.local()
+        # 本进程已确认存在的分区
+        self._partitions = set()
+
+        conn = self._connection()
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('CREATE TABLE IF NOT EXISTS partitions (month TEXT PRIMARY KEY, loans INTEGER NOT NULL)')
+        conn.execute('CREATE TABLE IF NOT EXISTS title_counts (title TEXT NOT NULL, issue TEXT NOT NULL,'
+                     ' loans INTEGER NOT NULL, PRIMARY KEY (title, issue)) WITHOUT ROWID')
+        conn.execute('CREATE TABLE IF NOT EXISTS reader_counts (reader_id TEXT PRIMARY KEY,'
+                     ' loans INTEGER NOT NULL) WITHOUT ROWID')
+        conn.execute('CREATE TABLE IF NOT EXISTS category_counts (category TEXT PRIMARY KEY,'
+                     ' loans INTEGER NOT NULL) WITHOUT ROWID')
+        conn.execute('CREATE TABLE IF NOT EXISTS daily_counts (day TEXT PRIMARY KEY,'
+                     ' loans INTEGER NOT NULL) WITHOUT ROWID')
+        self._partitions = {month for month, in conn.execute('SELECT month FROM partitions')}
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self._path, timeout=30, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    def _ensure_partition(self, conn: sqlite3.Connection, month: str) -> None:
+        if month in self._partitions:
+            return
+        # 期号为空串而不是 NULL，才能作为 WITHOUT ROWID 表的主键
+        conn.execute(f'CREATE TABLE IF NOT EXISTS {month} (reader_id TEXT NOT NULL, title TEXT NOT NULL,'
+                     ' issue TEXT NOT NULL, due_at INTEGER NOT NULL, borrowed_at INTEGER,'
+                     ' returned_at INTEGER NOT NULL, PRIMARY KEY (reader_id, title, issue, due_at)) WITHOUT ROWID')
+        conn.execute('INSERT OR IGNORE INTO partitions (month, loans) VALUES (?, 0)', (month,))
+        self._partitions.add(month)
+
+    def record(self, reader_id: str, title: str, issue, category: str, borrowed_at, due_date: datetime,
+               returned_at: datetime) -> bool:
+        """追加一次已完成的借阅并更新计数；已记录过时返回 False"""
+        month = partition_name(returned_at)
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            self._ensure_partition(conn, month)
+            inserted = conn.execute(
+                f'INSERT OR IGNORE INTO {month} (reader_id, title, issue, due_at, borrowed_at, returned_at)'
+                ' VALUES (?, ?, ?, ?, ?, ?)',
+                (reader_id, title, issue or '', _timestamp(due_date), _timestamp(borrowed_at),
+                 _timestamp(returned_at))
+            ).rowcount == 1
+            if inserted:
+                conn.execute('UPDATE partitions SET loans = loans + 1 WHERE month = ?', (month,))
+                for sql, key in (
+                    ('INSERT INTO title_counts (title, issue, loans) VALUES (?, ?, 1)'
+                     ' ON CONFLICT (title, issue) DO UPDATE SET loans = loans + 1', (title, issue or '')),
+                    ('INSERT INTO reader_counts (reader_id, loans) VALUES (?, 1)'
+                     ' ON CONFLICT (reader_id) DO UPDATE SET loans = loans + 1', (reader_id,)),
+                    ('INSERT INTO category_counts (category, loans) VALUES (?, 1)'
+                     ' ON CONFLICT (category) DO UPDATE SET loans = loans + 1', (category,)),
+                    ('INSERT INTO daily_counts (day, loans) VALUES (?, 1)'
+                     ' ON CONFLICT (day) DO UPDATE SET loans = loans + 1', (returned_at.date().isoformat(),)),
+                ):
+                    conn.execute(sql, key)
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        return inserted
+
+    def title_count(self, title: str, issue=None) -> int:
+        row = self._connection().execute(
+            'SELECT loans FROM title_counts WHERE title = ? AND issue = ?', (title, issue or '')).fetchone()
+        return row[0] if row else 0
+
+    def reader_count(self, reader_id: str) -> int:
+        row = self._connection().execute(
+            'SELECT loans FROM reader_counts WHERE reader_id = ?', (reader_id,)).fetchone()
+        return row[0] if row else 0
+
+    def report(self, days: int = DEFAULT_DAYS, top: int = DEFAULT_TOP, today: date = None) -> dict:
+        """流通报表：排行、分类和最近 days 天每天归还的借阅数，只读计数表"""
+        conn = self._connection()
+        since = ((today or date.today()) - timedelta(days=days - 1)).isoformat()
+        return {
+            'total': conn.execute('SELECT COALESCE(SUM(loans), 0) FROM partitions').fetchone()[0],
+            'top_titles': [{'title': title, 'issue': issue or None, 'loans': loans}
+                           for title, issue, loans in conn.execute(
+                               'SELECT title, issue, loans FROM title_counts ORDER BY loans DESC LIMIT ?', (top,))],
+            'top_readers': [{'reader_id': reader_id, 'loans': loans} for reader_id, loans in conn.execute(
+                'SELECT reader_id, loans FROM reader_counts ORDER BY loans DESC LIMIT ?', (top,))],
+            'categories': dict(conn.execute('SELECT category, loans FROM category_counts ORDER BY loans DESC')),
+            'daily': dict(conn.execute('SELECT day, loans FROM daily_counts WHERE day >= ? ORDER BY day', (since,))),
+            'partitions': dict(conn.execute('SELECT month, loans FROM partitions ORDER BY month')),
+        }
+
+    def borrowed_since(self, since: datetime) -> list:
+        """since 之后借出、已归还的借阅 [(标题, 期号, 借出时间)]；归还不早于借出，只需查此后的分区"""
+        conn = self._connection()
+        months = [month for month, in conn.execute(
+            'SELECT month FROM partitions WHERE month >= ? ORDER BY month', (partition_name(since),))]
+        rows = []
+        for month in months:
+            rows.extend((title, issue or None, EPOCH + borrowed_at * MICROSECOND) for title, issue, borrowed_at in
+                        conn.execute(f'SELECT title, issue, borrowed_at FROM {month} WHERE borrowed_at >= ?',
+                                     (_timestamp(since),)))
+        return rows
+
+    def reader_baskets(self) -> dict:
+        """读者 ID -> 借过的出版物 [(标题, 期号)]，按归还先后排列；全量扫描，供批量任务使用"""
+        conn = self._connection()
+        baskets = {}
+        for month, in conn.execute('SELECT month FROM partitions ORDER BY month').fetchall():
+            for reader_id, title, issue in conn.execute(
+                    f'SELECT reader_id, title, issue FROM {month} ORDER BY returned_at'):
+                baskets.setdefault(reader_id, []).append((title, issue or None))
+        return baskets
+
+    def month(self, year: int, month: int, limit: int = 1000) -> list:
+        """某个月归还的借阅明细，按归还时间排列"""
+        name = partition_name(datetime(year, month, 1))
+        conn = self._connection()
+        # 分区可能由其他进程创建，以分区表为准
+        if conn.execute('SELECT 1 FROM partitions WHERE month = ?', (name,)).fetchone() is None:
+            return []
+        rows = conn.execute(
+            f'SELECT reader_id, title, issue, borrowed_at, due_at, returned_at FROM {name}'
+            ' ORDER BY returned_at LIMIT ?', (limit,))
+        return [
+            {
+                'reader_id': reader_id,
+                'title': title,
+                'issue': issue or None,
+                'borrowed_at': _datetime(borrowed_at),
+                'due_date': _datetime(due_at),
+                'returned_at': _datetime(returned_at),
+            }
+            for reader_id, title, issue, borrowed_at, due_at, returned_at in rows
+        ]
@@ -0,0 +1,178 @@
+"""内存占用统计
+
+- MemoryAccounting：按实体类型（图书、期刊、读者、借阅、索引、缓存……）估算占用的字节数。
+  对象图用 sys.getsizeof 递归累加，遇到其他实体即停止，避免把互相引用的对象重复计入；
+  实例很多时只随机抽样一部分再按数量外推。
+- SnapshotStore：按需拍摄 tracemalloc 快照并比较任意两次快照，用来定位泄漏。
+"""
+import random
+import sys
+import threading
+import tracemalloc
+from collections import deque
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# 超过该数量的实例只抽样估算
+SAMPLE_SIZE = 2000
+
+# 保留的快照数量，超出后丢弃最早的
+MAX_SNAPSHOTS = 10
+
+# tracemalloc 记录的调用栈深度
+TRACE_FRAMES = 10
+
+# 不计入对象大小的共享对象类型
+_SHARED_TYPES = (type, type(sys), type(len), type(lambda: None))
+
+
+def deep_sizeof(obj, stop_types: tuple = (), exclude: tuple = ()) -> int:
+    """obj 及其引用的对象的总字节数
+
+    不进入 stop_types 的实例（obj 本身除外）和 exclude 中的对象。
+    """
+    seen = {id(o) for o in exclude}
+    stack = [obj]
+    total = 0
+    while stack:
+        current = stack.pop()
+        if id(current) in seen or isinstance(current, _SHARED_TYPES):
+            continue
+        if current is not obj and isinstance(current, stop_types):
+            continue
+        seen.add(id(current))
+        total += sys.getsizeof(current)
+        if isinstance(current, dict):
+            stack.extend(current.keys())
+            stack.extend(current.values())
+        elif isinstance(current, (list, tuple, set, frozenset, deque)):
+            stack.extend(current)
+        if hasattr(current, '__dict__'):
+            stack.append(vars(current))
+        for cls in type(current).__mro__:
+            for name in getattr(cls, '__slots__', ()):
+                if hasattr(current, name):
+                    stack.append(getattr(current, name))
+    return total
+
+
+def estimate(objects: list, sizeof) -> dict:
+    """对每个对象调用 sizeof 并汇总，数量超过 SAMPLE_SIZE 时抽样外推"""
+    count = len(objects)
+    sample = objects if count <= SAMPLE_SIZE else random.sample(objects, SAMPLE_SIZE)
+    measured = sum(sizeof(o) for o in sample)
+    total = measured * count // len(sample) if sample else 0
+    return {
+        'count': count,
+        'bytes': total,
+        'bytes_per_item': total / count if count else 0,
+        'sampled': len(sample) < count,
+    }
+
+
+class MemoryAccounting:
+    """回调返回 estimate() 格式的字典，report() 时才调用"""
+
+    def __init__(self) -> None:
+        self._categories = {}
+
+    def register(self, name: str, callback) -> None:
+        self._categories[name] = callback
+
+    def report(self) -> dict:
+        categories = {name: callback() for name, callback in self._categories.items()}
+        return {
+            'process': process_memory(),
+            'categories': categories,
+            'accounted_bytes': sum(c['bytes'] for c in categories.values()),
+        }
+
+
+def process_memory() -> dict:
+    """当前和峰值常驻内存（字节），无法获取时为 None"""
+    rss = None
+    try:
+        with open('/proc/self/status', encoding='ascii') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    rss = int(line.split()[1]) * 1024
+                    break
+    except OSError:
+        pass
+    peak = None
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # macOS 单位为字节，Linux 为 KiB
+        peak = peak if sys.platform == 'darwin' else peak * 1024
+    return {'rss_bytes': rss, 'peak_rss_bytes': peak}
+
+
+class SnapshotStore:
+    def __init__(self, max_snapshots: int = MAX_SNAPSHOTS) -> None:
+        self._snapshots = {}
+        self._max_snapshots = max_snapshots
+        self._next_id = 1
+        self._lock = threading.Lock()
+
+    @property
+    def tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self, frames: int = TRACE_FRAMES) -> None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+
+    def stop(self) -> None:
+        """停止追踪并丢弃所有快照"""
+        tracemalloc.stop()
+        with self._lock:
+            self._snapshots.clear()
+
+    def take(self, label: str = '') -> dict:
+        """拍摄快照，尚未开始追踪时先开始（只能看到此后分配的内存）"""
+        self.start()
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        ])
+        traced_bytes = sum(stat.size for stat in snapshot.statistics('filename'))
+        with self._lock:
+            snapshot_id = self._next_id
+            self._next_id += 1
+            self._snapshots[snapshot_id] = (label, datetime.now(), snapshot, traced_bytes)
+            while len(self._snapshots) > self._max_snapshots:
+                del self._snapshots[min(self._snapshots)]
+            return self._describe(snapshot_id)
+
+    def _describe(self, snapshot_id: int) -> dict:
+        label, taken_at, _, traced_bytes = self._snapshots[snapshot_id]
+        return {
+            'id': snapshot_id,
+            'label': label,
+            'taken_at': taken_at.isoformat(timespec='seconds'),
+            'traced_bytes': traced_bytes,
+        }
+
+    def list(self) -> list:
+        with self._lock:
+            return [self._describe(i) for i in sorted(self._snapshots)]
+
+    def diff(self, old_id: int, new_id: int, key_type: str = 'lineno', limit: int = 30) -> list:
+        """两次快照间增长最多的分配位置；快照不存在时抛出 KeyError"""
+        with self._lock:
+            old = self._snapshots[old_id][2]
+            new = self._snapshots[new_id][2]
+        return [
+            {
+                'location': str(stat.traceback),
+                'size_diff': stat.size_diff,
+                'size': stat.size,
+                'count_diff': stat.count_diff,
+                'count': stat.count,
+            }
+            for stat in new.compare_to(old, key_type)[:limit]
+        ]
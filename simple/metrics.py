@@ -0,0 +1,156 @@
+"""运行指标 - 直方图和回调式指标，以 Prometheus 文本格式导出
+
+记录路径上只做一次分桶查找和一次加法。每个线程第一次记录时轮流分到一个带锁的分片，
+并发请求很少争用同一把锁；导出时再把各分片合并。
+"""
+import bisect
+import functools
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# 分片数量，线程轮流分到各分片
+SHARDS = 16
+
+# 线程 ID 是按对齐的地址分配的，直接取模会全部落到同一个分片，改为按线程首次记录的顺序分配
+_thread_shard = threading.local()
+_shard_counter = itertools.count()
+
+
+def _shard_index() -> int:
+    index = getattr(_thread_shard, 'index', None)
+    if index is None:
+        index = _thread_shard.index = next(_shard_counter) % SHARDS
+    return index
+
+
+class _Shard:
+    __slots__ = ('lock', 'values')
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.values = {}
+
+
+class _ShardedMetric:
+    def __init__(self, name: str, documentation: str, labels: tuple = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._shards = [_Shard() for _ in range(SHARDS)]
+
+    def _shard(self) -> _Shard:
+        return self._shards[_shard_index()]
+
+    def _merged(self, zero, merge) -> dict:
+        merged = {}
+        for shard in self._shards:
+            with shard.lock:
+                items = list(shard.values.items())
+            for key, value in items:
+                merged[key] = merge(merged.get(key, zero()), value)
+        return merged
+
+    def _label_text(self, values: tuple, extra: str = '') -> str:
+        pairs = [f'{k}="{_escape(v)}"' for k, v in zip(self.labels, values)]
+        if extra:
+            pairs.append(extra)
+        return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Histogram(_ShardedMetric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labels: tuple = (), buckets=DEFAULT_BUCKETS) -> None:
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, seconds: float, *label_values) -> None:
+        index = bisect.bisect_left(self.buckets, seconds)
+        shard = self._shard()
+        with shard.lock:
+            entry = shard.values.get(label_values)
+            if entry is None:
+                # 各桶计数（最后一个为 +Inf）、总和
+                entry = shard.values[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            entry[index] += 1
+            entry[-1] += seconds
+
+    @contextmanager
+    def time(self, *label_values):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *label_values)
+
+    def timed(self, *label_values):
+        """函数装饰器：记录每次调用的耗时"""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.time(*label_values):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def samples(self):
+        zero = lambda: [0] * (len(self.buckets) + 1) + [0.0]
+        merged = self._merged(zero, lambda a, b: [x + y for x, y in zip(a, b)])
+        for key, entry in sorted(merged.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), entry[:-1]):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else _number(bound)
+                le_label = f'le="{le}"'
+                yield f'{self.name}_bucket{self._label_text(key, le_label)} {cumulative}'
+            yield f'{self.name}_sum{self._label_text(key)} {_number(entry[-1])}'
+            yield f'{self.name}_count{self._label_text(key)} {cumulative}'
+
+
+class CallbackMetric:
+    """导出时才调用回调取值，适合目录规模这类现成的数值"""
+
+    def __init__(self, name: str, documentation: str, callback, kind: str = 'gauge') -> None:
+        self.name = name
+        self.documentation = documentation
+        self.kind = kind
+        self._callback = callback
+
+    def samples(self):
+        value = self._callback()
+        if isinstance(value, dict):
+            # 回调返回 {((标签名, 标签值), ...): 数值}
+            for labels, number in sorted(value.items()):
+                label_text = ','.join(f'{k}="{_escape(v)}"' for k, v in labels)
+                yield f'{self.name}{{{label_text}}} {_number(number)}'
+        else:
+            yield f'{self.name} {_number(value)}'
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _number(value) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
@@ -0,0 +1,69 @@
+"""拼音搜索
+
+出版物加入馆藏时把书名和作者（期刊为出版商）中的汉字转成全拼和首字母两种写法，
+例如“设计模式”记为 shejimoshi 和 sjms，放入与书名纠错相同的三元组索引，查询时
+不再转换馆藏中的文本，与直接按汉字搜索一样只查倒排表：
+
+- 不少于三个字母的查询匹配全拼或首字母中的任意位置（moshi、jms）；
+- 一两个字母的查询只匹配开头（sj），这样也能用开头的片段直接查倒排表。
+
+依赖 pypinyin（已列入 requirements.txt），未安装时索引为空，拼音查询没有结果。
+"""
+from typing import Hashable, Optional
+
+from fuzzy_index import GRAM, TrigramIndex
+
+try:
+    from pypinyin import lazy_pinyin
+except ImportError:
+    lazy_pinyin = None
+
+
+def has_han(text: str) -> bool:
+    return any('\u4e00' <= c <= '\u9fff' for c in text)
+
+
+def romanize(text: str) -> tuple:
+    """(全拼, 首字母)；非汉字部分只保留字母和数字，首字母取每段的第一个字符
+
+    多音字取 pypinyin 按词组判断的读音，不展开所有读音的组合。
+    """
+    syllables = [''.join(c for c in s if c.isalnum()) for s in lazy_pinyin(text)]
+    syllables = [s for s in syllables if s]
+    return ''.join(syllables), ''.join(s[0] for s in syllables)
+
+
+class PinyinIndex:
+    def __init__(self) -> None:
+        self._index = TrigramIndex()
+        # 键 -> 已加入索引的写法，删除时使用
+        self._forms = {}
+
+    @property
+    def available(self) -> bool:
+        return lazy_pinyin is not None
+
+    def __len__(self) -> int:
+        return len(self._forms)
+
+    def add(self, key: Hashable, *texts: Optional[str]) -> None:
+        """为 key 加入各段文本的拼音写法；不含汉字的文本跳过"""
+        if lazy_pinyin is None:
+            return
+        forms = {form for text in texts if text and has_han(text) for form in romanize(text)}
+        if not forms:
+            return
+        self._forms.setdefault(key, set()).update(forms)
+        for form in forms:
+            self._index.add(key, form)
+
+    def discard(self, key: Hashable) -> None:
+        for form in self._forms.pop(key, ()):
+            self._index.discard(key, form)
+
+    def search(self, query: str, limit: Optional[int] = None) -> list:
+        """拼音或首字母匹配的键"""
+        query = ''.join(query.split())
+        if not query.isascii() or not query.isalpha():
+            return []
+        return self._index.search(query, limit, prefix=len(query) < GRAM)
@@ -0,0 +1,134 @@
+"""按需性能剖析
+
+- 单个请求：带上 ?_profile=stats（或请求头 X-Profile: stats）时用 cProfile 剖析该请求，
+  结果保存为 .prof 文件并以文本返回；?_profile=collapsed 时对处理该请求的线程采样，
+  返回折叠栈（collapsed stack）文本。
+- 持续采样：StackSampler 在后台线程中定期采样所有线程的调用栈，导出的折叠栈
+  可直接交给 flamegraph.pl 或 speedscope 生成火焰图。
+"""
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+from collections import Counter
+from datetime import datetime
+
+from flask import Response, g, request
+
+# 采样间隔（秒）
+DEFAULT_INTERVAL = 0.005
+
+# 文本报告中列出的函数数
+STATS_LIMIT = 60
+
+
+def _frame_stack(frame) -> str:
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class StackSampler:
+    """定期采样线程调用栈并按折叠栈计数
+
+    thread_ids 为 None 时采样除自身以外的所有线程。
+    """
+
+    def __init__(self, interval: float = DEFAULT_INTERVAL, thread_ids=None) -> None:
+        self.interval = interval
+        self._thread_ids = thread_ids
+        self._stacks = Counter()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.samples = 0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stacks.clear()
+            self.samples = 0
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            with self._lock:
+                self.samples += 1
+                for thread_id, frame in frames.items():
+                    if thread_id == own_id:
+                        continue
+                    if self._thread_ids is not None and thread_id not in self._thread_ids:
+                        continue
+                    self._stacks[_frame_stack(frame)] += 1
+
+    def collapsed(self) -> str:
+        """折叠栈格式：每行“帧;帧;帧 次数”"""
+        with self._lock:
+            return ''.join(f'{stack} {count}\n' for stack, count in self._stacks.most_common())
+
+
+def init_request_profiling(app, is_allowed, output_dir: str) -> None:
+    """注册单请求剖析；is_allowed() 返回 False 时忽略剖析参数"""
+
+    def requested_mode():
+        return request.args.get('_profile') or request.headers.get('X-Profile')
+
+    @app.before_request
+    def start_request_profile():
+        mode = requested_mode()
+        if mode not in ('stats', 'collapsed') or not is_allowed():
+            return
+        if mode == 'stats':
+            g.profiler = cProfile.Profile()
+            g.profiler.enable()
+        else:
+            g.profiler = StackSampler(thread_ids={threading.get_ident()})
+            g.profiler.start()
+
+    @app.after_request
+    def finish_request_profile(response):
+        profiler = g.pop('profiler', None)
+        if profiler is None:
+            return response
+        # 流式响应的主体在这里一次性生成，保证页面渲染也在剖析范围内
+        response.make_sequence()
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+        os.makedirs(output_dir, exist_ok=True)
+        if isinstance(profiler, cProfile.Profile):
+            profiler.disable()
+            path = os.path.join(output_dir, f'{stamp}-{request.endpoint}.prof')
+            profiler.dump_stats(path)
+            text = io.StringIO()
+            pstats.Stats(profiler, stream=text).sort_stats('cumulative').print_stats(STATS_LIMIT)
+            body = text.getvalue()
+        else:
+            profiler.stop()
+            body = profiler.collapsed() or '# 请求太快，未采到样本，请改用 ?_profile=stats\n'
+            path = os.path.join(output_dir, f'{stamp}-{request.endpoint}.collapsed')
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(body)
+        result = Response(body, mimetype='text/plain')
+        result.headers['X-Profile-File'] = os.path.basename(path)
+        return result
@@ -0,0 +1,19 @@
+"""推荐索引重建的子进程
+
+从标准输入读取一组读者的借阅记录（pickle 的 [[出版物, ...], ...]），统计共现次数后把结果
+pickle 到标准输出。由 recommendations.py 用 subprocess 启动全新的解释器执行，只导入
+recommendations 和标准库，不导入 app，也不继承父进程的线程和锁。
+"""
+import pickle
+import sys
+
+from recommendations import count_pairs
+
+
+def main() -> None:
+    baskets = pickle.load(sys.stdin.buffer)
+    pickle.dump(count_pairs(baskets), sys.stdout.buffer, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+if __name__ == '__main__':
+    main()
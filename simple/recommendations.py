@@ -0,0 +1,205 @@
+"""“借过这本书的读者也借了”推荐
+
+稀疏共现矩阵：出版物 -> {出版物: 被同一读者借过的人数}。每个出版物预先算好共现最多的
+NEIGHBORS 个邻居，给读者推荐时只合并其最近借过的几本书的邻居列表，与馆藏和历史规模无关。
+
+- 全量重建：按读者把借阅记录分块，分给几个子进程统计共现后合并，定时在后台线程中运行。
+  子进程用 subprocess 启动全新的解释器执行 recommendation_worker.py：重建时进程里已有请求
+  线程和后台线程，fork 会复制其他线程持有的锁；multiprocessing 的 spawn / forkserver 又会
+  在子进程中重新执行主模块（python app.py 启动时就是整个应用）；
+- 增量更新：两次重建之间，每次借阅只更新该读者已借过的出版物与新出版物之间的计数。
+"""
+import heapq
+import logging
+import os
+import pickle
+import subprocess
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Hashable
+
+# 每个出版物保留的邻居数
+NEIGHBORS = 20
+# 统计共现时每个读者只看最近借过的这么多本，避免借阅量极大的读者产生平方级的配对
+MAX_BASKET = 50
+# 推荐时参考读者最近借过的本数
+RECENT_ITEMS = 10
+# 每块的读者数；只有一块时直接在当前进程统计
+CHUNK_SIZE = 2000
+
+WORKER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'recommendation_worker.py')
+
+# 默认重建间隔（秒）
+DEFAULT_INTERVAL = 24 * 60 * 60
+
+logger = logging.getLogger('library.recommendations')
+
+
+def _dedupe(items: list) -> list:
+    """去掉重复借阅，保留每个出版物最后一次出现的位置"""
+    return list(dict.fromkeys(reversed(items)))[::-1]
+
+
+def count_pairs(baskets: list) -> dict:
+    """统计一组读者借阅记录中的共现次数（双向都计）"""
+    counts = {}
+    for basket in baskets:
+        basket = _dedupe(basket)[-MAX_BASKET:]
+        for item in basket:
+            row = counts.setdefault(item, {})
+            for other in basket:
+                if other != item:
+                    row[other] = row.get(other, 0) + 1
+    return counts
+
+
+def _merge(target: dict, counts: dict) -> None:
+    for item, row in counts.items():
+        merged = target.get(item)
+        if merged is None:
+            target[item] = row
+            continue
+        for other, count in row.items():
+            merged[other] = merged.get(other, 0) + count
+
+
+def _count_in_subprocess(baskets: list) -> dict:
+    """在子进程中执行 count_pairs(baskets)"""
+    result = subprocess.run([sys.executable, WORKER], input=pickle.dumps(baskets, pickle.HIGHEST_PROTOCOL),
+                            stdout=subprocess.PIPE, check=True)
+    return pickle.loads(result.stdout)
+
+
+def _top_neighbors(row: dict) -> list:
+    return heapq.nlargest(NEIGHBORS, row.items(), key=lambda item: item[1])
+
+
+class CoBorrowIndex:
+    def __init__(self, workers: int = None) -> None:
+        self._workers = workers
+        # 读者 ID -> 借过的出版物（按借阅先后，dict 用作有序集合）
+        self._baskets = {}
+        self._counts = {}
+        # 出版物 -> [(邻居, 共现次数)]，按次数从多到少
+        self._neighbors = {}
+        # 重建期间的增量记录，重建完成后补到新索引上
+        self._pending = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.last_build = None
+
+    def record(self, reader_id: str, item: Hashable) -> None:
+        """读者借阅了 item；同一读者重复借阅同一出版物不重复计数"""
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append((reader_id, item))
+            self._record(reader_id, item)
+
+    def _record(self, reader_id: str, item: Hashable) -> None:
+        basket = self._baskets.setdefault(reader_id, {})
+        if item in basket:
+            return
+        for other in list(basket)[-MAX_BASKET:]:
+            self._bump(item, other)
+            self._bump(other, item)
+        basket[item] = None
+
+    def _bump(self, item: Hashable, other: Hashable) -> None:
+        row = self._counts.setdefault(item, {})
+        count = row[other] = row.get(other, 0) + 1
+        neighbors = self._neighbors.setdefault(item, [])
+        for i, (neighbor, _) in enumerate(neighbors):
+            if neighbor == other:
+                del neighbors[i]
+                break
+        else:
+            if len(neighbors) >= NEIGHBORS and count <= neighbors[-1][1]:
+                return
+        # 列表很短，按次数插入到第一个比它少的位置
+        position = next((i for i, (_, existing) in enumerate(neighbors) if existing < count), len(neighbors))
+        neighbors.insert(position, (other, count))
+        del neighbors[NEIGHBORS:]
+
+    def neighbors(self, item: Hashable) -> list:
+        with self._lock:
+            return list(self._neighbors.get(item, ()))
+
+    def recommend(self, reader_id: str, n: int = 5, exclude: tuple = ()) -> list:
+        """按读者最近借过的出版物的邻居列表合并打分，返回 [(出版物, 分数)]"""
+        with self._lock:
+            basket = list(self._baskets.get(reader_id, ()))
+            scores = {}
+            for item in basket[-RECENT_ITEMS:]:
+                for other, count in self._neighbors.get(item, ()):
+                    scores[other] = scores.get(other, 0) + count
+        for item in basket + list(exclude):
+            scores.pop(item, None)
+        return heapq.nlargest(n, scores.items(), key=lambda item: item[1])
+
+    def rebuild(self, snapshot) -> dict:
+        """用 snapshot() 返回的读者 ID -> [出版物]（按借阅先后）全量重建索引
+
+        先开始记录增量再取快照，取快照之后的借阅会补到新索引上（已在快照中的自动去重）。
+        """
+        with self._lock:
+            self._pending = []
+        try:
+            baskets = snapshot()
+            readers = list(baskets.values())
+            chunks = [readers[i:i + CHUNK_SIZE] for i in range(0, len(readers), CHUNK_SIZE)]
+            counts = {}
+            if len(chunks) > 1:
+                # 每个子进程处理若干块，线程只负责等待子进程和收发数据
+                workers = min(self._workers or os.cpu_count() or 1, len(chunks))
+                shares = [[basket for chunk in chunks[i::workers] for basket in chunk] for i in range(workers)]
+                with ThreadPoolExecutor(workers) as pool:
+                    for partial in pool.map(_count_in_subprocess, shares):
+                        _merge(counts, partial)
+            else:
+                for chunk in chunks:
+                    _merge(counts, count_pairs(chunk))
+            neighbors = {item: _top_neighbors(row) for item, row in counts.items()}
+            new_baskets = {reader_id: dict.fromkeys(_dedupe(items)) for reader_id, items in baskets.items()}
+        except BaseException:
+            with self._lock:
+                self._pending = None
+            raise
+
+        with self._lock:
+            pending, self._pending = self._pending, None
+            self._baskets, self._counts, self._neighbors = new_baskets, counts, neighbors
+            for reader_id, item in pending:
+                self._record(reader_id, item)
+        self.last_build = {'readers': len(baskets), 'items': len(counts), 'chunks': len(chunks)}
+        return self.last_build
+
+    def start(self, snapshot, interval: float = DEFAULT_INTERVAL) -> None:
+        """在后台线程中每隔 interval 秒用 snapshot() 的结果重建一次，启动后立即重建一次"""
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, args=(snapshot, interval), name='recommendations',
+                                            daemon=True)
+        self._thread.start()
+
+    def _run(self, snapshot, interval: float) -> None:
+        while not self._stop.is_set():
+            try:
+                self.rebuild(snapshot)
+            except Exception:
+                logger.exception('推荐索引重建失败')
+            self._wake.wait(interval)
+            self._wake.clear()
+
+    def trigger(self) -> None:
+        """唤醒后台线程立即重建一次"""
+        self._wake.set()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
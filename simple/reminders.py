@@ -0,0 +1,327 @@
+"""到期提醒
+
+与前端 notificationService 的两类通知一致：到期前一天发 due_reminder，逾期后每 7 天发一次
+overdue。全部工作在后台线程中完成，请求线程只在借阅时往时间轮里放一个条目：
+
+- TimerWheel：按分钟分槽的哈希时间轮，插入 O(1)，每次推进只看经过的槽；
+- Outbox：SQLite 发件箱，到期的提醒在一个事务内批量写入，按去重键忽略重复
+  （多进程各自调度同一笔借阅时只写一条）；
+- 投递时先认领一批未发送的记录再交给 sink，成功后批量标记为已发送，失败的稍后重试。
+
+sink 是带 send(messages) 方法的对象，这里提供写 JSON Lines 文件和保存在内存中的两种实现。
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+
+# 到期前多久提醒，逾期后每隔多久再提醒一次
+REMIND_BEFORE = timedelta(days=1)
+OVERDUE_REPEAT = timedelta(days=7)
+
+# 时间轮每槽的秒数和槽数（一圈一天）
+TICK_SECONDS = 60
+WHEEL_SLOTS = 24 * 60
+
+# 每次投递的条数；认领后超过这个秒数仍未发送视为投递进程已退出，可重新认领
+DISPATCH_BATCH = 500
+CLAIM_TIMEOUT = 300
+
+# 默认调度间隔（秒）
+DEFAULT_INTERVAL = TICK_SECONDS
+
+logger = logging.getLogger('library.reminders')
+
+
+class TimerWheel:
+    def __init__(self, tick_seconds: int = TICK_SECONDS, slots: int = WHEEL_SLOTS) -> None:
+        self._tick_seconds = tick_seconds
+        self._slots = [[] for _ in range(slots)]
+        self._current = None
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _tick(self, when: datetime) -> int:
+        return int(when.timestamp() // self._tick_seconds)
+
+    def schedule(self, when: datetime, item) -> None:
+        """when 已经过去时在下一次推进时触发"""
+        tick = self._tick(when)
+        if self._current is not None and tick <= self._current:
+            tick = self._current + 1
+        self._slots[tick % len(self._slots)].append((tick, item))
+        self._size += 1
+
+    def advance(self, now: datetime) -> list:
+        """推进到 now，返回到期的条目"""
+        target = self._tick(now)
+        if self._current is None:
+            # 首次推进时从最早的条目开始，启动前已安排好的过期条目也会触发；
+            # 但不能越过 now，否则之后安排的、早于最早条目的提醒会被推迟
+            ticks = [tick for slot in self._slots for tick, _ in slot]
+            self._current = min(min(ticks, default=target), target) - 1
+        if target <= self._current:
+            return []
+        fired = []
+        # 跨过一整圈以上时每个槽只需看一次
+        start = max(self._current + 1, target - len(self._slots) + 1)
+        for tick in range(start, target + 1):
+            index = tick % len(self._slots)
+            slot = self._slots[index]
+            if not slot:
+                continue
+            remaining = [entry for entry in slot if entry[0] > target]
+            if len(remaining) != len(slot):
+                fired.extend(item for entry_tick, item in slot if entry_tick <= target)
+                self._slots[index] = remaining
+        self._current = target
+        self._size -= len(fired)
+        return fired
+
+
+class Outbox:
+    def __init__(self, path: str) -> None:
+        self._path = path
+        self._local = threading.local()
+        conn = self._connection()
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS outbox ('
+            ' id INTEGER PRIMARY KEY AUTOINCREMENT,'
+            ' dedupe_key TEXT NOT NULL UNIQUE,'
+            ' reader_id TEXT NOT NULL,'
+            ' kind TEXT NOT NULL,'
+            ' message TEXT NOT NULL,'
+            ' created_at TEXT NOT NULL,'
+            ' claimed_at REAL,'
+            ' attempts INTEGER NOT NULL DEFAULT 0,'
+            ' sent_at TEXT)'
+        )
+        conn.execute('CREATE INDEX IF NOT EXISTS outbox_unsent ON outbox (sent_at, id)')
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self._path, timeout=30, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    def add_many(self, rows: list) -> int:
+        """批量写入 [(去重键, 读者 ID, 类型, 内容)]，返回新写入的条数"""
+        if not rows:
+            return 0
+        conn = self._connection()
+        now = datetime.now().isoformat()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            before = conn.total_changes
+            conn.executemany(
+                'INSERT OR IGNORE INTO outbox (dedupe_key, reader_id, kind, message, created_at)'
+                ' VALUES (?, ?, ?, ?, ?)',
+                [row + (now,) for row in rows]
+            )
+            added = conn.total_changes - before
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        return added
+
+    def claim(self, limit: int = DISPATCH_BATCH) -> list:
+        """认领一批未发送的提醒"""
+        conn = self._connection()
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            rows = conn.execute(
+                'SELECT id, reader_id, kind, message, created_at FROM outbox'
+                ' WHERE sent_at IS NULL AND (claimed_at IS NULL OR claimed_at < ?) ORDER BY id LIMIT ?',
+                (now - CLAIM_TIMEOUT, limit)
+            ).fetchall()
+            conn.executemany('UPDATE outbox SET claimed_at = ?, attempts = attempts + 1 WHERE id = ?',
+                             [(now, row[0]) for row in rows])
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        return [dict(zip(('id', 'reader_id', 'kind', 'message', 'created_at'), row)) for row in rows]
+
+    def mark_sent(self, ids: list) -> None:
+        sent_at = datetime.now().isoformat()
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.executemany('UPDATE outbox SET sent_at = ? WHERE id = ?', [(sent_at, i) for i in ids])
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+    def release(self, ids: list) -> None:
+        """投递失败，放回待发送"""
+        self._connection().executemany('UPDATE outbox SET claimed_at = NULL WHERE id = ?', [(i,) for i in ids])
+
+    def summary(self) -> dict:
+        conn = self._connection()
+        counts = {}
+        for kind, sent, count in conn.execute(
+                'SELECT kind, sent_at IS NOT NULL, COUNT(*) FROM outbox GROUP BY kind, sent_at IS NOT NULL'):
+            counts.setdefault(kind, {'pending': 0, 'sent': 0})['sent' if sent else 'pending'] = count
+        return counts
+
+
+class MemorySink:
+    """保存在内存中，只保留最近的 maxlen 条，用于开发和测试"""
+
+    def __init__(self, maxlen: int = 1000) -> None:
+        self.messages = deque(maxlen=maxlen)
+
+    def send(self, messages: list) -> None:
+        self.messages.extend(messages)
+
+
+class FileSink:
+    """每条提醒追加一行 JSON"""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+
+    def send(self, messages: list) -> None:
+        with open(self.path, 'a', encoding='utf-8') as f:
+            for message in messages:
+                f.write(json.dumps(message, ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def make_sink(spec: str):
+    """memory 或 file:路径"""
+    if spec == 'memory':
+        return MemorySink()
+    if spec.startswith('file:'):
+        return FileSink(spec[len('file:'):])
+    raise ValueError(f'不支持的提醒投递方式：{spec}')
+
+
+def _due_message(title: str, due_date: datetime) -> str:
+    return f"您借阅的《{title}》将于 {due_date.strftime('%Y-%m-%d')} 到期，请及时归还。"
+
+
+def _overdue_message(title: str, days: int) -> str:
+    return f"您借阅的《{title}》已逾期 {days} 天，请尽快归还。"
+
+
+class ReminderScheduler:
+    """is_active(读者 ID, 标题, 期号, 应还日期) 判断借阅是否仍未归还；已归还的条目触发时丢弃"""
+
+    def __init__(self, outbox: Outbox, sink, is_active) -> None:
+        self.outbox = outbox
+        self.sink = sink
+        self._is_active = is_active
+        self._wheel = TimerWheel()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.last_run = None
+
+    def schedule_loan(self, reader_id: str, title: str, issue, due_date: datetime, now: datetime = None) -> None:
+        """为一笔借阅安排下一次提醒；已错过的阶段立即触发，由发件箱去重"""
+        now = now or datetime.now()
+        loan = (reader_id, title, issue, due_date)
+        if now < due_date + REMIND_BEFORE:
+            # 到期前一天（已过则立即）提醒，之后安排逾期提醒
+            entry = (max(now, due_date - REMIND_BEFORE), loan, 'due_reminder', 0)
+        else:
+            period = (now - due_date - REMIND_BEFORE) // OVERDUE_REPEAT
+            entry = (now, loan, 'overdue', period)
+        with self._lock:
+            self._wheel.schedule(entry[0], entry[1:])
+
+    def _next(self, loan: tuple, kind: str, period: int) -> tuple:
+        due_date = loan[3]
+        if kind == 'due_reminder':
+            return due_date + REMIND_BEFORE, (loan, 'overdue', 0)
+        return due_date + REMIND_BEFORE + (period + 1) * OVERDUE_REPEAT, (loan, 'overdue', period + 1)
+
+    def run_once(self, now: datetime = None) -> dict:
+        """推进时间轮，把到期的提醒批量写入发件箱，再投递所有未发送的提醒"""
+        now = now or datetime.now()
+        started = time.perf_counter()
+        with self._lock:
+            fired = self._wheel.advance(now)
+        rows = []
+        follow_ups = []
+        for loan, kind, period in fired:
+            reader_id, title, issue, due_date = loan
+            if not self._is_active(*loan):
+                continue
+            key = '\x1f'.join((reader_id, title, issue or '', due_date.isoformat(), kind, str(period)))
+            if kind == 'due_reminder':
+                message = _due_message(title, due_date)
+            else:
+                message = _overdue_message(title, max(1, (now - due_date).days))
+            rows.append((key, reader_id, kind, message))
+            follow_ups.append(self._next(loan, kind, period))
+        added = self.outbox.add_many(rows)
+        with self._lock:
+            for when, entry in follow_ups:
+                self._wheel.schedule(when, entry)
+
+        delivered = 0
+        while True:
+            batch = self.outbox.claim()
+            if not batch:
+                break
+            try:
+                self.sink.send(batch)
+            except Exception:
+                self.outbox.release([m['id'] for m in batch])
+                logger.exception('提醒投递失败，稍后重试')
+                break
+            self.outbox.mark_sent([m['id'] for m in batch])
+            delivered += len(batch)
+        self.last_run = {'at': now.isoformat(), 'fired': len(fired), 'queued': added, 'delivered': delivered,
+                         'scheduled': len(self._wheel), 'seconds': time.perf_counter() - started}
+        return self.last_run
+
+    def start(self, snapshot, interval: float = DEFAULT_INTERVAL) -> None:
+        """在后台线程中为 snapshot() 返回的在借记录 [(读者 ID, 标题, 期号, 应还日期)] 安排提醒，
+        之后每隔 interval 秒调度一次"""
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, args=(snapshot, interval), name='reminders',
+                                            daemon=True)
+        self._thread.start()
+
+    def _run(self, snapshot, interval: float) -> None:
+        try:
+            now = datetime.now()
+            for loan in snapshot():
+                self.schedule_loan(*loan, now=now)
+        except Exception:
+            logger.exception('安排到期提醒失败')
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception:
+                logger.exception('到期提醒调度失败')
+            self._wake.wait(interval)
+            self._wake.clear()
+
+    def trigger(self) -> None:
+        """唤醒后台线程立即调度一次"""
+        self._wake.set()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
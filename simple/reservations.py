@@ -0,0 +1,86 @@
+"""预约队列
+
+每个出版物一个队列，按（优先级，预约序号）出队：优先级相同时先到先得，与前端
+reservationService 按预约时间排序一致。入队和出队为 O(log n)；取消只把条目标记为
+失效（O(1)），失效条目在出队时跳过，堆中失效条目过多时整体重建。
+"""
+import heapq
+from datetime import datetime
+from typing import Optional
+
+# 堆中失效条目超过有效条目的这一倍数时重建堆
+COMPACT_RATIO = 2
+
+
+class Reservation:
+    __slots__ = ('priority', 'seq', 'reader_id', 'reserved_at', 'expires_at', 'active')
+
+    def __init__(self, priority: int, seq: int, reader_id: str, reserved_at: datetime, expires_at: datetime) -> None:
+        self.priority = priority
+        self.seq = seq
+        self.reader_id = reader_id
+        self.reserved_at = reserved_at
+        self.expires_at = expires_at
+        self.active = True
+
+    def __lt__(self, other: 'Reservation') -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class ReservationQueue:
+    def __init__(self) -> None:
+        self._heap = []
+        self._entries = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, reader_id: str) -> bool:
+        return reader_id in self._entries
+
+    def get(self, reader_id: str) -> Optional[Reservation]:
+        return self._entries.get(reader_id)
+
+    def push(self, reservation: Reservation) -> None:
+        self._entries[reservation.reader_id] = reservation
+        heapq.heappush(self._heap, reservation)
+
+    def cancel(self, reader_id: str) -> Optional[Reservation]:
+        reservation = self._entries.pop(reader_id, None)
+        if reservation is None:
+            return None
+        reservation.active = False
+        if len(self._heap) > COMPACT_RATIO * len(self._entries) + 8:
+            self._heap = [r for r in self._heap if r.active]
+            heapq.heapify(self._heap)
+        return reservation
+
+    def pop(self, eligible) -> Optional[Reservation]:
+        """取出第一个满足 eligible(reservation) 的预约；不满足的预约保留在队列中"""
+        skipped = []
+        found = None
+        while self._heap:
+            reservation = heapq.heappop(self._heap)
+            if not reservation.active:
+                continue
+            if eligible(reservation):
+                found = reservation
+                break
+            skipped.append(reservation)
+        for reservation in skipped:
+            heapq.heappush(self._heap, reservation)
+        if found is not None:
+            del self._entries[found.reader_id]
+            found.active = False
+        return found
+
+    def position(self, reader_id: str) -> Optional[int]:
+        """排队位置（从 1 开始），O(n)，仅用于展示"""
+        reservation = self._entries.get(reader_id)
+        if reservation is None:
+            return None
+        return 1 + sum(1 for other in self._entries.values() if other < reservation)
+
+    def entries(self) -> list:
+        """按出队顺序排列的有效预约"""
+        return sorted(self._entries.values())
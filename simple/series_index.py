@@ -0,0 +1,63 @@
+"""期刊系列索引
+
+按系列（标题, 出版商）分组保存各期期刊，组内按期号排序，最后一项就是最新一期：
+
+- 加入、移除一期时二分查找位置，新的一期通常追加在末尾；
+- 取最新一期、判断新加入的一期是否成为最新一期都是 O(1)，不再扫描全部期刊。
+
+期号中的数字按数值比较，2023-9 排在 2023-10 之前。
+"""
+import bisect
+import re
+from typing import Hashable, Optional
+
+
+def issue_key(issue: str) -> tuple:
+    """期号排序键：按数字切分后数字段按数值比较，切分结果中字符串段和数字段交替出现"""
+    return tuple(int(part) if i % 2 else part for i, part in enumerate(re.split(r'(\d+)', issue)))
+
+
+class SeriesIndex:
+    def __init__(self) -> None:
+        # 系列 -> [(期号排序键, 期号)]，以及系列 -> {期号: 期刊}
+        self._order = {}
+        self._issues = {}
+
+    def __len__(self) -> int:
+        return len(self._issues)
+
+    def add(self, series: Hashable, issue: str, item) -> tuple:
+        """加入一期，返回 (加入前的最新一期, 加入后的最新一期)"""
+        order = self._order.setdefault(series, [])
+        issues = self._issues.setdefault(series, {})
+        previous = issues[order[-1][1]] if order else None
+        if issue not in issues:
+            entry = (issue_key(issue), issue)
+            if not order or entry > order[-1]:
+                order.append(entry)
+            else:
+                bisect.insort(order, entry)
+        issues[issue] = item
+        return previous, issues[order[-1][1]]
+
+    def remove(self, series: Hashable, issue: str):
+        """移除一期，返回移除后的最新一期；系列已空时返回 None"""
+        issues = self._issues.get(series)
+        if issues is None or issues.pop(issue, None) is None:
+            return self.latest(series)
+        order = self._order[series]
+        del order[bisect.bisect_left(order, (issue_key(issue), issue))]
+        if not order:
+            del self._order[series]
+            del self._issues[series]
+            return None
+        return issues[order[-1][1]]
+
+    def latest(self, series: Hashable) -> Optional[object]:
+        order = self._order.get(series)
+        return self._issues[series][order[-1][1]] if order else None
+
+    def issues(self, series: Hashable) -> list:
+        """系列中的各期，从旧到新"""
+        issues = self._issues.get(series, {})
+        return [issues[issue] for _, issue in self._order.get(series, ())]
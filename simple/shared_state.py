@@ -0,0 +1,90 @@
+"""多进程共享状态 - 基于 SQLite 变更日志
+
+每个 worker 进程仍在内存中保留完整的 Library，所有变更以事件形式追加到
+共享的 SQLite 文件中（权威数据）。写操作在 BEGIN IMMEDIATE 事务内进行，
+进入事务时先追平其他进程的事件，保证同一本书不会被两个进程同时借出；
+其他进程在处理下一个请求前读取新事件并增量应用到本地对象和缓存。
+"""
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+
+class SharedStore:
+    def __init__(self, path: str) -> None:
+        self._path = path
+        self._local = threading.local()
+        # 同一进程内的线程共享一个 Library，写操作和追平都需要串行
+        self._lock = threading.RLock()
+        self._library = None
+        self._replaying = False
+        self.last_seq = 0
+
+        conn = self._connection()
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS events ('
+            ' seq INTEGER PRIMARY KEY AUTOINCREMENT,'
+            ' event TEXT NOT NULL,'
+            ' payload TEXT NOT NULL)'
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 连接不能跨线程使用，每个线程各自持有一个
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self._path, timeout=30, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    def attach(self, library, last_seq: int = 0) -> None:
+        """开始记录 library 的变更；last_seq 为本地数据快照对应的日志位置"""
+        self._library = library
+        self.last_seq = last_seq
+        library.subscribe(self._record)
+        self.sync()
+
+    def _record(self, event: str, payload: dict) -> None:
+        if self._replaying:
+            return
+        cursor = self._connection().execute(
+            'INSERT INTO events (event, payload) VALUES (?, ?)',
+            (event, json.dumps(payload, ensure_ascii=False))
+        )
+        self.last_seq = cursor.lastrowid
+
+    def _catch_up(self, conn: sqlite3.Connection) -> int:
+        rows = conn.execute(
+            'SELECT seq, event, payload FROM events WHERE seq > ? ORDER BY seq',
+            (self.last_seq,)
+        ).fetchall()
+        self._replaying = True
+        try:
+            for seq, event, payload in rows:
+                self._library.apply_event(event, json.loads(payload))
+                self.last_seq = seq
+        finally:
+            self._replaying = False
+        return len(rows)
+
+    def sync(self) -> int:
+        """应用其他进程追加的事件，返回应用的事件数"""
+        with self._lock:
+            return self._catch_up(self._connection())
+
+    @contextmanager
+    def transaction(self):
+        """跨进程写事务：持有数据库写锁，先追平再执行修改，退出时提交"""
+        with self._lock:
+            conn = self._connection()
+            conn.execute('BEGIN IMMEDIATE')
+            start_seq = self.last_seq
+            try:
+                self._catch_up(conn)
+                yield
+            except BaseException:
+                conn.execute('ROLLBACK')
+                self.last_seq = start_seq
+                raise
+            conn.execute('COMMIT')
@@ -0,0 +1,63 @@
+"""启动耗时分解
+
+app.py 在导入时完成全部初始化，这里按阶段（导入、解析数据文件、重建对象、构建索引、
+处理第一个请求）记录耗时，写入日志并通过 /metrics 导出。
+"""
+import logging
+import threading
+import time
+
+logger = logging.getLogger('library.startup')
+
+
+class StartupTimer:
+    def __init__(self, started: float = None) -> None:
+        self.started = started if started is not None else time.perf_counter()
+        self._last_mark = self.started
+        # 阶段名 -> 秒，按记录顺序
+        self.phases = {}
+        # 从开始导入到可以处理请求的总耗时
+        self.ready_seconds = None
+
+    def record(self, name: str, seconds: float) -> None:
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def mark(self, name: str) -> None:
+        """把上一个标记点到现在的耗时记为 name 阶段"""
+        now = time.perf_counter()
+        self.record(name, now - self._last_mark)
+        self._last_mark = now
+
+    def mark_ready(self) -> None:
+        self.ready_seconds = time.perf_counter() - self.started
+        self.log()
+
+    def log(self) -> None:
+        phases = '，'.join(f'{name} {seconds:.3f}s' for name, seconds in self.phases.items())
+        logger.info('启动完成，共 %.3fs（%s）', self.ready_seconds, phases)
+
+    def report(self) -> dict:
+        return {'phases': dict(self.phases), 'ready_seconds': self.ready_seconds}
+
+
+def track_first_request(app, timer: StartupTimer) -> None:
+    """第一个请求的处理耗时记为 first_request 阶段（模板首次编译等都发生在这里）"""
+    lock = threading.Lock()
+    first = {}
+
+    @app.before_request
+    def start_first_request():
+        if first:
+            return
+        with lock:
+            if not first:
+                first['thread'] = threading.get_ident()
+                first['started'] = time.perf_counter()
+
+    # 流式响应在页面输出完毕后才执行 teardown，耗时包含整页渲染
+    @app.teardown_request
+    def finish_first_request(exc):
+        if first.get('thread') != threading.get_ident() or 'first_request' in timer.phases:
+            return
+        timer.record('first_request', time.perf_counter() - first['started'])
+        logger.info('第一个请求耗时 %.3fs', timer.phases['first_request'])
@@ -0,0 +1,126 @@
+"""冷启动耗时检查
+
+用合成的参考数据集在全新进程中多次导入 app 并处理第一个请求，取各次的中位数，
+总耗时或任一阶段超出预算时以非零状态码退出，可在部署前的流水线中运行。每次启动都在
+新的临时目录中进行，上一次留下的 SQLite 数据库不会让后面几次变成热启动。
+test_startup.py 用默认参考数据集和预算做同样的检查。
+
+    python startup_check.py                                   # 默认参考数据集与预算
+    python startup_check.py --books 20000 --budget 8 --phase-budget hydrate=5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date
+
+from gen_data import generate, write_json
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 子进程：导入应用、处理第一个请求，输出各阶段耗时和启动前工作目录中已有的文件
+CHILD_CODE = '''
+import json, os, sys
+files_before = sorted(os.listdir('.'))
+import app
+app.app.test_client().get('/').close()
+json.dump(dict(app.startup_timer.report(), files_before=files_before), sys.stdout)
+'''
+
+DEFAULT_BUDGET = 5.0
+DEFAULT_REPEAT = 3
+
+# 参考数据集的固定基准日期，保证每次生成的数据相同
+REFERENCE_DATE = date(2024, 1, 1)
+
+
+def cold_start(workdir: str) -> dict:
+    env = dict(os.environ, PYTHONPATH=APP_DIR)
+    env.pop('LIBRARY_SHARED_DB', None)
+    started = time.perf_counter()
+    output = subprocess.run([sys.executable, '-c', CHILD_CODE], cwd=workdir, env=env,
+                            check=True, capture_output=True, text=True).stdout
+    wall = time.perf_counter() - started
+    report = json.loads(output)
+    # 墙钟时间另含解释器自身的启动
+    report['wall_seconds'] = wall
+    return report
+
+
+def reference_data(books: int = 5000, series: int = 20, issues: int = 12, readers: int = 1000,
+                   loans: int = 1000) -> dict:
+    return generate(books, series, issues, readers, loans, base_date=REFERENCE_DATE)
+
+
+def measure(data: dict, repeat: int = DEFAULT_REPEAT, verbose: bool = False) -> dict:
+    """冷启动 repeat 次，每次在新的临时目录中从同一份数据文件开始，返回各次结果和中位数"""
+    runs = []
+    for i in range(repeat):
+        with tempfile.TemporaryDirectory(prefix='startup-') as workdir:
+            write_json(data, os.path.join(workdir, 'library_data.json'))
+            runs.append(cold_start(workdir))
+        if verbose:
+            print(f"  第 {i + 1} 次：{runs[-1]['wall_seconds']:.3f}s", flush=True)
+    phases = {name: statistics.median(run['phases'].get(name, 0.0) for run in runs) for name in runs[0]['phases']}
+    total = statistics.median(run['wall_seconds'] for run in runs)
+    return {'wall_seconds': total, 'phases': phases, 'runs': runs}
+
+
+def parse_phase_budget(text: str) -> tuple:
+    name, _, seconds = text.partition('=')
+    try:
+        return name, float(seconds)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'格式应为 阶段=秒数：{text}')
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='冷启动耗时检查')
+    parser.add_argument('--books', type=int, default=5000)
+    parser.add_argument('--series', type=int, default=20)
+    parser.add_argument('--issues', type=int, default=12)
+    parser.add_argument('--readers', type=int, default=1000)
+    parser.add_argument('--loans', type=int, default=1000)
+    parser.add_argument('--data', help='使用已有的数据文件代替生成的参考数据集')
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT)
+    parser.add_argument('--budget', type=float, default=DEFAULT_BUDGET, help='从启动进程到第一个请求完成的预算（秒）')
+    parser.add_argument('--phase-budget', type=parse_phase_budget, action='append', default=[],
+                        help='单个阶段的预算，如 hydrate=2，可重复')
+    parser.add_argument('--json', help='把结果另存为 JSON 文件')
+    args = parser.parse_args(argv)
+
+    if args.data:
+        with open(args.data, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    else:
+        data = reference_data(args.books, args.series, args.issues, args.readers, args.loans)
+    result = measure(data, args.repeat, verbose=True)
+    total, phases = result['wall_seconds'], result['phases']
+
+    print(f'冷启动中位数 {total:.3f}s（预算 {args.budget:.3f}s）')
+    for name, seconds in phases.items():
+        print(f'  {name:16s}{seconds:>9.3f}s')
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+    failures = []
+    if total > args.budget:
+        failures.append(f'总耗时 {total:.3f}s 超出预算 {args.budget:.3f}s')
+    for name, budget in args.phase_budget:
+        if phases.get(name, 0.0) > budget:
+            failures.append(f'{name} 阶段 {phases[name]:.3f}s 超出预算 {budget:.3f}s')
+    if failures:
+        for line in failures:
+            print(line, file=sys.stderr)
+        return 1
+    print('启动耗时在预算之内')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
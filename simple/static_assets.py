@@ -0,0 +1,49 @@
+"""静态资源指纹 - url_for('static', ...) 生成带内容哈希的地址，并配合长缓存"""
+import hashlib
+import os
+import threading
+
+from flask import request
+
+# 带指纹的静态资源缓存一年
+FINGERPRINT_MAX_AGE = 365 * 24 * 3600
+
+
+def init_static_fingerprints(app, max_age: int = FINGERPRINT_MAX_AGE) -> None:
+    hashes = {}
+    lock = threading.Lock()
+
+    def asset_hash(filename: str):
+        path = os.path.join(app.static_folder, filename)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+        cached = hashes.get(filename)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        with open(path, 'rb') as f:
+            digest = hashlib.sha256(f.read()).hexdigest()[:12]
+        with lock:
+            hashes[filename] = (mtime, digest)
+        return digest
+
+    @app.url_defaults
+    def add_static_fingerprint(endpoint, values):
+        if endpoint == 'static' and 'filename' in values and 'v' not in values:
+            digest = asset_hash(values['filename'])
+            if digest:
+                values['v'] = digest
+
+    @app.after_request
+    def cache_fingerprinted_assets(response):
+        # 只有指纹与当前文件内容一致时才允许长缓存，旧页面引用的旧指纹按默认策略处理
+        if request.endpoint != 'static' or response.status_code not in (200, 304):
+            return response
+        version = request.args.get('v')
+        if version and version == asset_hash(request.view_args['filename']):
+            response.cache_control.public = True
+            response.cache_control.max_age = max_age
+            response.cache_control.immutable = True
+            response.cache_control.no_cache = None
+        return response
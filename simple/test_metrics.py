@@ -0,0 +1,46 @@
+"""运行指标的分片和导出测试
+
+    python -m unittest test_metrics
+"""
+import threading
+import unittest
+
+import metrics
+from metrics import Histogram
+
+THREADS = 8
+
+
+class ShardTest(unittest.TestCase):
+    def test_threads_spread_over_shards(self):
+        histogram = Histogram('t_seconds', 'test', labels=('route',))
+        # 所有线程同时存活，线程 ID 不会被复用
+        barrier = threading.Barrier(THREADS)
+
+        def work():
+            barrier.wait()
+            for _ in range(100):
+                histogram.observe(0.01, '/a')
+            barrier.wait()
+
+        threads = [threading.Thread(target=work) for _ in range(THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        used = [shard for shard in histogram._shards if shard.values]
+        self.assertEqual(len(used), min(THREADS, metrics.SHARDS))
+        # 各分片的计数之和等于记录次数
+        counts = sum(sum(shard.values[('/a',)][:-1]) for shard in used)
+        self.assertEqual(counts, THREADS * 100)
+
+    def test_thread_keeps_its_shard(self):
+        histogram = Histogram('t_seconds', 'test')
+        first = histogram._shard()
+        histogram.observe(0.5)
+        self.assertIs(histogram._shard(), first)
+        self.assertEqual(sum(1 for shard in histogram._shards if shard.values), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
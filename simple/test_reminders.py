@@ -0,0 +1,117 @@
+"""到期提醒的时间轮和发件箱测试
+
+    python -m unittest test_reminders
+"""
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+import reminders
+from reminders import Outbox, TimerWheel
+
+NOW = datetime(2026, 3, 1, 9, 0)
+TICK = timedelta(seconds=reminders.TICK_SECONDS)
+ROTATION = TICK * reminders.WHEEL_SLOTS
+
+
+class TimerWheelTest(unittest.TestCase):
+    def test_fires_when_due(self):
+        wheel = TimerWheel()
+        wheel.schedule(NOW + timedelta(hours=1), 'a')
+        self.assertEqual(wheel.advance(NOW), [])
+        self.assertEqual(wheel.advance(NOW + timedelta(minutes=59)), [])
+        self.assertEqual(wheel.advance(NOW + timedelta(hours=1)), ['a'])
+        self.assertEqual(len(wheel), 0)
+
+    def test_overdue_before_first_advance_fires_immediately(self):
+        wheel = TimerWheel()
+        wheel.schedule(NOW - timedelta(hours=3), 'late')
+        wheel.schedule(NOW + timedelta(hours=3), 'future')
+        self.assertEqual(wheel.advance(NOW), ['late'])
+        self.assertEqual(len(wheel), 1)
+
+    def test_first_advance_does_not_skip_ahead_of_now(self):
+        # 启动时只有较远的条目，之后安排的较近条目不能被推迟到较远条目的时间
+        wheel = TimerWheel()
+        wheel.schedule(NOW + timedelta(days=12), 'far')
+        self.assertEqual(wheel.advance(NOW), [])
+        wheel.schedule(NOW + timedelta(days=6), 'near')
+        self.assertEqual(wheel.advance(NOW + timedelta(days=6)), ['near'])
+        self.assertEqual(wheel.advance(NOW + timedelta(days=12)), ['far'])
+
+    def test_schedule_after_first_advance(self):
+        wheel = TimerWheel()
+        wheel.advance(NOW)
+        wheel.schedule(NOW + timedelta(minutes=5), 'a')
+        wheel.schedule(NOW - timedelta(minutes=5), 'past')
+        self.assertEqual(wheel.advance(NOW + TICK), ['past'])
+        self.assertEqual(wheel.advance(NOW + timedelta(minutes=5)), ['a'])
+
+    def test_entries_beyond_one_rotation_wait_for_their_tick(self):
+        wheel = TimerWheel()
+        wheel.advance(NOW)
+        # 与 NOW + 1 分钟落在同一个槽，但晚了整整一圈
+        wheel.schedule(NOW + TICK, 'soon')
+        wheel.schedule(NOW + TICK + ROTATION, 'next_round')
+        wheel.schedule(NOW + timedelta(days=3), 'later')
+        self.assertEqual(wheel.advance(NOW + TICK), ['soon'])
+        self.assertEqual(wheel.advance(NOW + ROTATION), [])
+        self.assertEqual(wheel.advance(NOW + TICK + ROTATION), ['next_round'])
+        self.assertEqual(wheel.advance(NOW + timedelta(days=3)), ['later'])
+        self.assertEqual(len(wheel), 0)
+
+    def test_advance_across_several_rotations(self):
+        wheel = TimerWheel()
+        wheel.advance(NOW)
+        for hours in (1, 30, 50):
+            wheel.schedule(NOW + timedelta(hours=hours), hours)
+        self.assertEqual(sorted(wheel.advance(NOW + timedelta(days=5))), [1, 30, 50])
+        self.assertEqual(len(wheel), 0)
+
+
+class OutboxTest(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.outbox = Outbox(os.path.join(self._dir.name, 'outbox.db'))
+
+    def tearDown(self):
+        self.outbox._connection().close()
+        self._dir.cleanup()
+
+    def test_add_many_ignores_duplicate_keys(self):
+        rows = [('k1', 'r1', 'due_reminder', 'm1'), ('k2', 'r2', 'overdue', 'm2')]
+        self.assertEqual(self.outbox.add_many(rows), 2)
+        self.assertEqual(self.outbox.add_many(rows + [('k3', 'r1', 'overdue', 'm3')]), 1)
+        self.assertEqual(self.outbox.summary(), {'due_reminder': {'pending': 1, 'sent': 0},
+                                                 'overdue': {'pending': 2, 'sent': 0}})
+
+    def test_claimed_messages_are_not_claimed_again(self):
+        self.outbox.add_many([(f'k{i}', 'r', 'overdue', f'm{i}') for i in range(5)])
+        first = self.outbox.claim(limit=3)
+        self.assertEqual([m['message'] for m in first], ['m0', 'm1', 'm2'])
+        second = self.outbox.claim()
+        self.assertEqual([m['message'] for m in second], ['m3', 'm4'])
+        self.assertEqual(self.outbox.claim(), [])
+
+    def test_mark_sent_and_release(self):
+        self.outbox.add_many([('k1', 'r', 'overdue', 'm1'), ('k2', 'r', 'overdue', 'm2')])
+        sent, failed = self.outbox.claim()
+        self.outbox.mark_sent([sent['id']])
+        self.outbox.release([failed['id']])
+        self.assertEqual([m['message'] for m in self.outbox.claim()], ['m2'])
+        self.assertEqual(self.outbox.summary(), {'overdue': {'pending': 1, 'sent': 1}})
+
+    def test_stale_claims_can_be_claimed_again(self):
+        self.outbox.add_many([('k1', 'r', 'overdue', 'm1')])
+        self.assertEqual(len(self.outbox.claim()), 1)
+        timeout = reminders.CLAIM_TIMEOUT
+        reminders.CLAIM_TIMEOUT = -1
+        try:
+            self.assertEqual(len(self.outbox.claim()), 1)
+        finally:
+            reminders.CLAIM_TIMEOUT = timeout
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,36 @@
+"""冷启动耗时预算测试
+
+    python -m unittest test_startup
+
+用 startup_check.py 的默认参考数据集冷启动三次，取中位数与预算比较。预算默认与
+startup_check.py 相同，可用环境变量 LIBRARY_STARTUP_BUDGET（秒）调整。
+"""
+import os
+import unittest
+
+import startup_check
+
+BUDGET = float(os.environ.get('LIBRARY_STARTUP_BUDGET', startup_check.DEFAULT_BUDGET))
+PHASES = ['import', 'parse', 'hydrate', 'index', 'first_request']
+
+
+class ColdStartTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.result = startup_check.measure(startup_check.reference_data())
+
+    def test_each_run_starts_cold(self):
+        # 每次启动前工作目录中只有数据文件，没有上一次留下的 SQLite 数据库
+        for run in self.result['runs']:
+            self.assertEqual(run['files_before'], ['library_data.json'])
+
+    def test_all_phases_recorded(self):
+        self.assertEqual(list(self.result['phases']), PHASES)
+
+    def test_within_budget(self):
+        total = self.result['wall_seconds']
+        self.assertLessEqual(total, BUDGET, f'冷启动中位数 {total:.3f}s 超出预算 {BUDGET:.3f}s')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,168 @@
+"""请求链路追踪
+
+每个被采样的请求生成一棵嵌套的 span 树（请求 → 领域方法 → 查找 / 持久化 / 模板渲染），
+请求结束后以 Chrome Trace Event 格式追加到本地文件，可直接用 chrome://tracing 或
+ui.perfetto.dev 打开。文件是 JSON 数组格式，末尾的 "]" 按规范可以省略，
+多个进程可以追加到同一个文件，按 pid 区分。
+
+未被采样或未启用时，span 只多一次 contextvars 读取。
+"""
+import functools
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from flask import before_render_template, request, template_rendered
+
+# 当前线程 / 协程中正在进行的 span
+_current: ContextVar[Optional['Span']] = ContextVar('current_span', default=None)
+
+
+class _Trace:
+    __slots__ = ('trace_id', 'events')
+
+    def __init__(self) -> None:
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.events = []
+
+
+class Span:
+    __slots__ = ('trace', 'name', 'category', 'parent', 'attrs', 'start_us', 'start_ns')
+
+    def __init__(self, trace: _Trace, name: str, category: str, parent: Optional['Span'], attrs: dict) -> None:
+        self.trace = trace
+        self.name = name
+        self.category = category
+        self.parent = parent
+        self.attrs = attrs
+        self.start_us = time.time_ns() // 1000
+        self.start_ns = time.perf_counter_ns()
+
+
+class Tracer:
+    """path 为 None 或 sample_rate 为 0 时不记录任何 span"""
+
+    def __init__(self, path: Optional[str] = None, sample_rate: float = 1.0) -> None:
+        self.path = path
+        self.sample_rate = sample_rate
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    @property
+    def enabled(self) -> bool:
+        return self.path is not None and self.sample_rate > 0
+
+    def start_trace(self, name: str, category: str = 'request', **attrs) -> Optional[Span]:
+        """开始一条新的链路，未被采样时返回 None"""
+        if not self.enabled or random.random() >= self.sample_rate:
+            _current.set(None)
+            return None
+        span = Span(_Trace(), name, category, None, attrs)
+        _current.set(span)
+        return span
+
+    def start_span(self, name: str, category: str = 'app', **attrs) -> Optional[Span]:
+        """在当前链路中开始一个子 span，没有进行中的链路时返回 None"""
+        parent = _current.get()
+        if parent is None:
+            return None
+        span = Span(parent.trace, name, category, parent, attrs)
+        _current.set(span)
+        return span
+
+    def finish(self, span: Optional[Span]) -> None:
+        if span is None:
+            return
+        duration_us = (time.perf_counter_ns() - span.start_ns) / 1000
+        span.trace.events.append({
+            'name': span.name,
+            'cat': span.category,
+            'ph': 'X',
+            'ts': span.start_us,
+            'dur': duration_us,
+            'pid': self._pid,
+            'tid': threading.get_ident(),
+            'args': {'trace_id': span.trace.trace_id, **span.attrs},
+        })
+        _current.set(span.parent)
+        if span.parent is None:
+            self._flush(span.trace)
+
+    @contextmanager
+    def span(self, name: str, category: str = 'app', **attrs):
+        span = self.start_span(name, category, **attrs)
+        try:
+            yield span
+        finally:
+            self.finish(span)
+
+    def traced(self, name: str = None, category: str = 'app'):
+        """函数装饰器：在进行中的链路里为每次调用记录一个 span"""
+        def decorator(func):
+            span_name = name or func.__qualname__
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if _current.get() is None:
+                    return func(*args, **kwargs)
+                with self.span(span_name, category):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def _flush(self, trace: _Trace) -> None:
+        # 子 span 先结束，按开始时间排序后父 span 在前，查看器更容易还原嵌套
+        trace.events.sort(key=lambda e: e['ts'])
+        text = ''.join(json.dumps(e, ensure_ascii=False) + ',\n' for e in trace.events)
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                if f.tell() == 0:
+                    f.write('[\n')
+                f.write(text)
+
+
+def init_request_tracing(app, tracer: Tracer) -> None:
+    """每个请求一条链路，模板渲染记为子 span；流式响应在页面输出完毕后才结束链路"""
+    if not tracer.enabled:
+        return
+
+    @app.before_request
+    def start_request_trace():
+        tracer.start_trace(f'{request.method} {request.path}', endpoint=request.endpoint)
+
+    @app.after_request
+    def record_response_status(response):
+        span = _current.get()
+        while span is not None and span.parent is not None:
+            span = span.parent
+        if span is not None:
+            span.attrs['status'] = response.status_code
+        return response
+
+    @app.teardown_request
+    def finish_request_trace(exc):
+        # 出错时可能留有未结束的子 span，一并结束
+        span = _current.get()
+        while span is not None:
+            tracer.finish(span)
+            span = _current.get()
+
+    def template_started(sender, template, context, **extra):
+        tracer.start_span(f'render {template.name}', 'template')
+
+    def template_finished(sender, template, context, **extra):
+        span = _current.get()
+        while span is not None and span.category == 'template':
+            tracer.finish(span)
+            if span.name == f'render {template.name}':
+                break
+            span = _current.get()
+
+    before_render_template.connect(template_started, app, weak=False)
+    template_rendered.connect(template_finished, app, weak=False)
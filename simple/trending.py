@@ -0,0 +1,147 @@
+"""热门借阅排行
+
+按借阅事件流统计最近一周、一个月借阅最多的出版物，内存占用与历史长短无关：
+
+- 每天一个 Count-Min Sketch 桶，保留最长窗口的天数；每个窗口另有一个汇总 Sketch，
+  桶移出窗口时从汇总中减去，估算次数只需查汇总的 depth 个计数器。
+- 每个窗口只跟踪 k 个候选（heavy hitters）：借阅时用汇总 Sketch 估算次数，
+  超过候选中的最小值才替换。排行按需排序后缓存，查询与借阅总量无关。
+
+Count-Min 只会高估，候选被挤出后要等它再被借阅才能重新进入排行。
+"""
+import threading
+from array import array
+from datetime import datetime
+from typing import Hashable, Optional
+
+# 默认窗口：名称 -> 天数
+DEFAULT_WINDOWS = {'week': 7, 'month': 30}
+DEFAULT_WIDTH = 2048
+DEFAULT_DEPTH = 4
+DEFAULT_TOP_K = 10
+
+SECONDS_PER_DAY = 24 * 60 * 60
+
+
+class CountMinSketch:
+    __slots__ = ('width', 'depth', 'table')
+
+    def __init__(self, width: int = DEFAULT_WIDTH, depth: int = DEFAULT_DEPTH) -> None:
+        self.width = width
+        self.depth = depth
+        self.table = array('q', bytes(8 * width * depth))
+
+    def _cells(self, key: Hashable):
+        for row in range(self.depth):
+            yield row * self.width + hash((row, key)) % self.width
+
+    def add(self, key: Hashable, count: int = 1) -> None:
+        for cell in self._cells(key):
+            self.table[cell] += count
+
+    def estimate(self, key: Hashable) -> int:
+        return min(self.table[cell] for cell in self._cells(key))
+
+    def merge(self, other: 'CountMinSketch', sign: int = 1) -> None:
+        """加上（sign 为 -1 时减去）另一个同样大小的 Sketch"""
+        table = self.table
+        for i, value in enumerate(other.table):
+            if value:
+                table[i] += sign * value
+
+
+class _Window:
+    __slots__ = ('days', 'sketch', 'candidates', 'ranking')
+
+    def __init__(self, days: int, width: int, depth: int) -> None:
+        self.days = days
+        self.sketch = CountMinSketch(width, depth)
+        # 候选 -> 估算次数
+        self.candidates = {}
+        # 排好序的候选，None 表示需要重新排序
+        self.ranking = None
+
+
+class TrendingCounter:
+    def __init__(self, windows: dict = None, width: int = DEFAULT_WIDTH, depth: int = DEFAULT_DEPTH,
+                 k: int = DEFAULT_TOP_K) -> None:
+        self._width = width
+        self._depth = depth
+        self._k = k
+        self._windows = {name: _Window(days, width, depth) for name, days in (windows or DEFAULT_WINDOWS).items()}
+        self._max_days = max(w.days for w in self._windows.values())
+        # 天序号 -> 当天的 Sketch，只保留最长窗口内的天数
+        self._buckets = {}
+        self._today = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _day(when: datetime) -> int:
+        return int(when.timestamp() // SECONDS_PER_DAY)
+
+    def _advance(self, today: int) -> None:
+        if self._today is None or today - self._today >= self._max_days:
+            # 首次使用或跨过了整个最长窗口，全部从头开始
+            self._today = today
+            self._buckets.clear()
+            for window in self._windows.values():
+                window.sketch = CountMinSketch(self._width, self._depth)
+                window.candidates.clear()
+                window.ranking = None
+            return
+        while self._today < today:
+            self._today += 1
+            for window in self._windows.values():
+                expired = self._buckets.get(self._today - window.days)
+                if expired is not None:
+                    window.sketch.merge(expired, -1)
+            self._buckets.pop(self._today - self._max_days, None)
+        # 移出窗口的借阅已从汇总中减去，重新估算候选
+        for window in self._windows.values():
+            window.candidates = {key: count for key, count in
+                                 ((key, window.sketch.estimate(key)) for key in window.candidates) if count > 0}
+            window.ranking = None
+
+    def add(self, key: Hashable, when: Optional[datetime] = None) -> None:
+        """记录一次借阅；when 早于最长窗口时忽略"""
+        when = when or datetime.now()
+        day = self._day(when)
+        with self._lock:
+            if self._today is None or day > self._today:
+                self._advance(day)
+            age = self._today - day
+            if age >= self._max_days:
+                return
+            bucket = self._buckets.get(day)
+            if bucket is None:
+                bucket = self._buckets[day] = CountMinSketch(self._width, self._depth)
+            bucket.add(key)
+            for window in self._windows.values():
+                if age < window.days:
+                    window.sketch.add(key)
+                    self._offer(window, key, window.sketch.estimate(key))
+
+    def _offer(self, window: _Window, key: Hashable, count: int) -> None:
+        candidates = window.candidates
+        if key not in candidates and len(candidates) >= self._k:
+            # k 很小，直接找最小值
+            weakest = min(candidates, key=candidates.get)
+            if candidates[weakest] >= count:
+                return
+            del candidates[weakest]
+        candidates[key] = count
+        window.ranking = None
+
+    def top(self, window_name: str, now: Optional[datetime] = None) -> list:
+        """窗口内借阅最多的 [(键, 估算次数)]，按次数从多到少"""
+        day = self._day(now or datetime.now())
+        with self._lock:
+            if self._today is not None and day > self._today:
+                self._advance(day)
+            window = self._windows[window_name]
+            if window.ranking is None:
+                window.ranking = sorted(window.candidates.items(), key=lambda item: -item[1])
+            return window.ranking
+
+    def windows(self) -> dict:
+        return {name: window.days for name, window in self._windows.items()}